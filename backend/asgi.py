@@ -0,0 +1,133 @@
+"""ASGI entry point: uvicorn asgi:app --workers 4
+
+Every route is served by the Flask app through asgiref's WSGI bridge,
+except GET /search, which runs natively on an async SQLAlchemy engine
+(aiomysql, or aiosqlite for SQLite) with its own connection pool, so
+its movie, people and genre queries run concurrently instead of one
+after another. That engine always points at the primary database:
+DATABASE_REPLICA_URLS and the sticky-after-write cookie (replicas.py)
+only apply to the routes served through Flask.
+
+Install requirements-asgi.txt to use it.
+"""
+import asyncio
+from urllib.parse import parse_qs
+from asgiref.wsgi import WsgiToAsgi
+from sqlalchemy.ext.asyncio import create_async_engine
+from werkzeug.http import parse_etags
+from app import app as flask_app
+from search import search, in_order, SEARCH_MODELS
+import conditional
+
+
+def async_database_url(url):
+    if url.startswith("mysql+pymysql://"):
+        return url.replace("mysql+pymysql://", "mysql+aiomysql://", 1)
+    if url.startswith("sqlite://"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    return url
+
+
+def movie_item(row):
+    return dict(
+        movie_id=row["movie_id"],
+        title=row["title"],
+        release_year=row["release_year"],
+        duration=row["duration"],
+        rating=row["rating"],
+    )
+
+
+SEARCH_ITEMS = {
+    "movies": movie_item,
+    "people": lambda row: {"person_id": row["person_id"], "name": f"{row['first_name']} {row['last_name']}"},
+    "genres": lambda row: {"genre_id": row["genre_id"], "genre_name": row["genre_name"]},
+}
+
+
+class AsyncApp:
+    def __init__(self, wsgi_app):
+        self.flask_app = wsgi_app
+        self.wsgi = WsgiToAsgi(wsgi_app)
+        config = wsgi_app.config
+        url = async_database_url(config["SQLALCHEMY_DATABASE_URI"])
+        pool_options = {}
+        if not url.startswith("sqlite"):
+            pool_options = dict(
+                pool_size=config.get("ASYNC_DB_POOL_SIZE", 10),
+                max_overflow=config.get("ASYNC_DB_MAX_OVERFLOW", 10),
+                pool_recycle=config.get("ASYNC_DB_POOL_RECYCLE", 1800),
+                pool_pre_ping=True,
+            )
+        self.engine = create_async_engine(url, **pool_options)
+        self.cache_control = config.get("HTTP_CACHE_CONTROL", "public, max-age=0, must-revalidate")
+        self.etag_salt = config.get("ETAG_SALT", "")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self.lifespan(receive, send)
+        if scope["type"] == "http" and scope["path"] == "/search" and scope["method"] == "GET":
+            return await self.search(scope, send)
+        return await self.wsgi(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.engine.dispose()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    def _statements(self, q):
+        # index lookups and the LIKE fallback use the Flask session
+        with self.flask_app.app_context():
+            return {kind: search.statement(kind, q, limit=10) for kind in SEARCH_ITEMS}
+
+    async def _fetch(self, kind, stmt, ids):
+        if ids is not None and not ids:
+            return []
+        async with self.engine.connect() as conn:
+            rows = (await conn.execute(stmt)).mappings().all()
+        if ids is not None:
+            pk = SEARCH_MODELS[kind][1].key
+            rows = in_order(rows, ids, lambda row: row[pk])
+        return [SEARCH_ITEMS[kind](row) for row in rows]
+
+    async def search(self, scope, send):
+        headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope["headers"]}
+        query = parse_qs(scope["query_string"].decode()).get("q", [""])[0]
+        if not query:
+            body = self.json_body({"error": "Query parameter 'q' required"})
+            return await self.respond(send, 400, body, [("content-type", "application/json")])
+
+        statements = await asyncio.to_thread(self._statements, query)
+        kinds = list(statements)
+        results = await asyncio.gather(*(self._fetch(kind, *statements[kind]) for kind in kinds))
+        body = self.json_body(dict(zip(kinds, results)))
+
+        # the ranking comes from this worker's index, so the ETag is the body's (see conditional.py)
+        etag = conditional.body_etag(self.etag_salt, body)
+        response_headers = [("etag", f'"{etag}"'), ("cache-control", self.cache_control)]
+        if "origin" in headers:
+            response_headers.append(("access-control-allow-origin", "*"))
+        if "if-none-match" in headers and parse_etags(headers["if-none-match"]).contains(etag):
+            return await self.respond(send, 304, b"", response_headers)
+        return await self.respond(send, 200, body, response_headers + [("content-type", "application/json")])
+
+    def json_body(self, data):
+        # byte-for-byte what jsonify sends, so both entry points share ETags
+        return self.flask_app.json.response(data).get_data()
+
+    async def respond(self, send, status, body, headers):
+        headers = headers + [("content-length", str(len(body)))]
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(k.encode("latin-1"), v.encode("latin-1")) for k, v in headers],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+app = AsyncApp(flask_app)
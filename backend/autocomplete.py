@@ -0,0 +1,353 @@
+import bisect
+import copy
+import heapq
+import math
+import sys
+import time
+from array import array
+from models import db, Movie, Genre, Person, MovieGenre, MoviePerson
+from search import normalize
+from refresh import RefreshingIndex
+from benchmark import latency_percentiles
+
+KINDS = ("movies", "people", "genres")
+# Keys are truncated: nobody types 32 characters into a search box
+MAX_KEY_CHARS = 32
+# Overlay edits at which a PrefixIndex is rebuilt with them folded in
+COMPACT_AFTER = 1000
+MAX_COMPLETIONS = 20
+
+
+def _keys(label):
+    """Every word-start suffix of the normalized label, so "reev" finds "Keanu Reeves"."""
+    text = normalize(label)
+    starts = [0] + [i + 1 for i, c in enumerate(text) if c == " "]
+    return sorted({text[i:i + MAX_KEY_CHARS] for i in starts})
+
+
+def estimate_bytes(label, keys):
+    """Rough footprint of one document in a PrefixIndex."""
+    # label + doc arrays; per key: the string, its list slot, doc id, score, two tree slots
+    return sys.getsizeof(label) + 20 + sum(sys.getsizeof(k) + 28 for k in keys)
+
+
+class PrefixIndex:
+    """Sorted-array prefix index over one kind of document.
+
+    keys holds every word-start suffix of every label, sorted, with the
+    owning doc and its score in parallel arrays. A prefix selects a
+    contiguous range of keys by bisection, and a max segment tree over
+    the scores yields that range's documents best first, so the cost
+    of a lookup depends on the number of results, not on how many
+    documents match.
+
+    Documents added or removed after the build live in a small overlay
+    until COMPACT_AFTER edits trigger a rebuild of the arrays.
+    """
+
+    def __init__(self, docs=()):
+        """docs: (doc_id, label, score) tuples."""
+        docs = sorted(docs)
+        self.doc_ids = array("i", (d for d, _, _ in docs))
+        self.doc_scores = array("d", (s for _, _, s in docs))
+        self.labels = [label for _, label, _ in docs]
+        entries = sorted((key, doc_id, score) for doc_id, label, score in docs for key in _keys(label))
+        self.keys = [k for k, _, _ in entries]
+        self.key_docs = array("i", (d for _, d, _ in entries))
+        self.key_scores = array("d", (s for _, _, s in entries))
+        # tree[n + i] is key i; tree[j] is whichever of tree[2j], tree[2j + 1] scores higher
+        n = len(self.keys)
+        self.tree = array("i", [0] * n) + array("i", range(n))
+        scores = self.key_scores
+        for j in range(n - 1, 0, -1):
+            a, b = self.tree[2 * j], self.tree[2 * j + 1]
+            self.tree[j] = a if scores[a] >= scores[b] else b
+        self.added = {}  # doc_id -> (label, score, keys), replacing any array entry
+        self.removed = set()  # doc ids in the arrays that no longer count
+        self._shared_scores = False  # score arrays still shared with the index this was forked from
+
+    def __len__(self):
+        return len(self.doc_ids) - len(self.removed) + sum(d not in self.removed for d in self.added)
+
+    def label(self, doc_id):
+        if doc_id in self.added:
+            return self.added[doc_id][0]
+        i = bisect.bisect_left(self.doc_ids, doc_id)
+        return self.labels[i] if i < len(self.doc_ids) and self.doc_ids[i] == doc_id else None
+
+    def score(self, doc_id):
+        if doc_id in self.added:
+            return self.added[doc_id][1]
+        i = bisect.bisect_left(self.doc_ids, doc_id)
+        return self.doc_scores[i] if i < len(self.doc_ids) and self.doc_ids[i] == doc_id else 0.0
+
+    def _ranked(self, lo, hi):
+        """Key indexes in [lo, hi), highest score first."""
+        n = len(self.keys)
+        tree, scores = self.tree, self.key_scores
+        heap = []
+        lo, hi = lo + n, hi + n
+        while lo < hi:
+            if lo & 1:
+                heap.append((-scores[tree[lo]], tree[lo], lo))
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                heap.append((-scores[tree[hi]], tree[hi], hi))
+            lo >>= 1
+            hi >>= 1
+        heapq.heapify(heap)
+        while heap:
+            _, key, node = heapq.heappop(heap)
+            if node >= n:
+                yield key
+                continue
+            for child in (2 * node, 2 * node + 1):
+                heapq.heappush(heap, (-scores[tree[child]], tree[child], child))
+
+    def complete(self, prefix, limit=5):
+        """[(doc_id, label), ...] whose label has a word starting with prefix, best first."""
+        prefix = normalize(prefix)[:MAX_KEY_CHARS]
+        if not prefix:
+            return []
+        lo = bisect.bisect_left(self.keys, prefix)
+        hi = bisect.bisect_left(self.keys, prefix + "\uffff", lo)
+        found, seen = [], set()
+        for key in self._ranked(lo, hi):
+            doc_id = self.key_docs[key]
+            if doc_id in seen or doc_id in self.removed or doc_id in self.added:
+                continue
+            seen.add(doc_id)
+            found.append((-self.key_scores[key], doc_id))
+            if len(found) == limit:
+                break
+        for doc_id, (_, score, keys) in self.added.items():
+            if doc_id not in self.removed and any(k.startswith(prefix) for k in keys):
+                found.append((-score, doc_id))
+        return [(doc_id, self.label(doc_id)) for _, doc_id in sorted(found)[:limit]]
+
+    # -- incremental updates
+
+    def fork(self):
+        """A copy sharing the arrays, with its own overlay; rescore() copies the scores it changes."""
+        other = copy.copy(self)
+        other.added, other.removed = dict(self.added), set(self.removed)
+        other._shared_scores = True
+        return other
+
+    def add(self, doc_id, label, score=None):
+        """Index or re-index one document; score None keeps the current one."""
+        if score is None:
+            score = self.score(doc_id)
+        self.removed.discard(doc_id)
+        self.added[doc_id] = (label, score, _keys(label))
+        self._maybe_compact()
+
+    def rescore(self, doc_id, score):
+        """Change one document's score in place; its keys stay where they are."""
+        if doc_id in self.added:
+            label, _, keys = self.added[doc_id]
+            self.added[doc_id] = (label, score, keys)
+            return
+        i = bisect.bisect_left(self.doc_ids, doc_id)
+        if i == len(self.doc_ids) or self.doc_ids[i] != doc_id or doc_id in self.removed:
+            return
+        if self._shared_scores:
+            self.doc_scores, self.key_scores, self.tree = self.doc_scores[:], self.key_scores[:], self.tree[:]
+            self._shared_scores = False
+        self.doc_scores[i] = score
+        n = len(self.keys)
+        for key in _keys(self.labels[i]):
+            j = bisect.bisect_left(self.keys, key)
+            while j < n and self.keys[j] == key and self.key_docs[j] != doc_id:
+                j += 1
+            if j == n or self.keys[j] != key:
+                continue
+            self.key_scores[j] = score
+            # walk up the segment tree, re-picking the better child at each level
+            node = (j + n) >> 1
+            while node:
+                a, b = self.tree[2 * node], self.tree[2 * node + 1]
+                self.tree[node] = a if self.key_scores[a] >= self.key_scores[b] else b
+                node >>= 1
+
+    def remove(self, doc_id):
+        self.added.pop(doc_id, None)
+        i = bisect.bisect_left(self.doc_ids, doc_id)
+        if i < len(self.doc_ids) and self.doc_ids[i] == doc_id:
+            self.removed.add(doc_id)
+        self._maybe_compact()
+
+    def docs(self):
+        """Current (doc_id, label, score) tuples, arrays and overlay merged."""
+        for doc_id, label, score in zip(self.doc_ids, self.labels, self.doc_scores):
+            if doc_id not in self.removed and doc_id not in self.added:
+                yield doc_id, label, score
+        for doc_id, (label, score, _) in self.added.items():
+            yield doc_id, label, score
+
+    def _maybe_compact(self):
+        if len(self.added) + len(self.removed) >= COMPACT_AFTER:
+            self.__init__(list(self.docs()))
+
+
+def _within_budget(docs, budget):
+    """The best scored docs whose estimated size fits in budget bytes; (kept, dropped)."""
+    kept, used = [], 0
+    docs = sorted(docs, key=lambda d: (-d[2], d[0]))
+    for doc in docs:
+        used += estimate_bytes(doc[1], _keys(doc[1]))
+        if used > budget:
+            break
+        kept.append(doc)
+    return kept, len(docs) - len(kept)
+
+
+class AutocompleteIndex:
+    """Prefix indexes of movie titles, person names and genre names.
+
+    Movies rank by rating, people by number of credits and genres by
+    number of movies. When everything does not fit in max_bytes, each
+    kind gets a fair share of the budget and keeps its most popular
+    documents.
+    """
+
+    def __init__(self, indexes=None, dropped=None):
+        self.indexes = indexes or {kind: PrefixIndex() for kind in KINDS}
+        self.dropped = dropped or {kind: 0 for kind in KINDS}
+        self.built_at = time.monotonic()
+
+    @classmethod
+    def build(cls, max_bytes=64 * 1024 * 1024, chunk_size=10000):
+        credits = dict(
+            db.session.query(MoviePerson.person_id, db.func.count())
+            .group_by(MoviePerson.person_id)
+        )
+        movie_counts = dict(
+            db.session.query(MovieGenre.genre_id, db.func.count())
+            .group_by(MovieGenre.genre_id)
+        )
+        docs = {
+            "movies": [
+                (movie_id, title, float(rating or 0))
+                for movie_id, title, rating in
+                db.session.query(Movie.movie_id, Movie.title, Movie.rating).yield_per(chunk_size)
+            ],
+            "people": [
+                (person_id, f"{first_name} {last_name}", math.log1p(credits.get(person_id, 0)))
+                for person_id, first_name, last_name in
+                db.session.query(Person.person_id, Person.first_name, Person.last_name).yield_per(chunk_size)
+            ],
+            "genres": [
+                (genre_id, genre_name, float(movie_counts.get(genre_id, 0)))
+                for genre_id, genre_name in db.session.query(Genre.genre_id, Genre.genre_name)
+            ],
+        }
+        # fair share: kinds that need less than an even split of what is left
+        # (genres, usually) get all they need, the rest is shared out evenly
+        need = {kind: sum(estimate_bytes(label, _keys(label)) for _, label, _ in docs[kind]) for kind in KINDS}
+        indexes, dropped, left = {}, {}, max_bytes
+        for i, kind in enumerate(sorted(KINDS, key=need.get)):
+            budget = min(need[kind], left // (len(KINDS) - i))
+            left -= budget
+            kept, dropped[kind] = _within_budget(docs[kind], budget)
+            indexes[kind] = PrefixIndex(kept)
+        return cls({kind: indexes[kind] for kind in KINDS}, dropped)
+
+    def fork(self):
+        other = copy.copy(self)
+        other.indexes = {kind: index.fork() for kind, index in self.indexes.items()}
+        return other
+
+    def stats(self):
+        return {
+            kind: {
+                "documents": len(index),
+                "keys": len(index.keys),
+                "dropped_over_budget": self.dropped[kind],
+                "estimated_bytes": sum(estimate_bytes(label, _keys(label)) for _, label, _ in index.docs()),
+            }
+            for kind, index in self.indexes.items()
+        }
+
+
+class Autocomplete(RefreshingIndex):
+    """Process-wide AutocompleteIndex behind GET /autocomplete.
+
+    Built in the background when the app starts (INDEX_WARM_START),
+    otherwise on first use. This worker's create/update/delete routes
+    patch it; other workers' writes show up after
+    AUTOCOMPLETE_REFRESH_SECONDS, when it is rebuilt in the background
+    (see refresh.RefreshingIndex).
+    """
+
+    refresh_setting = "AUTOCOMPLETE_REFRESH_SECONDS"
+
+    def __init__(self):
+        super().__init__()
+        self.max_bytes = 64 * 1024 * 1024
+
+    def init_app(self, app, warm=False):
+        self.max_bytes = app.config.get("AUTOCOMPLETE_MAX_MB", 64) * 1024 * 1024
+        super().init_app(app, warm)
+
+    def build(self):
+        return AutocompleteIndex.build(self.max_bytes)
+
+    def _patch_doc(self, kind, doc_id, label=None, score=None):
+        def patch(index):
+            target = index.indexes[kind]
+            if label is None:
+                target.remove(doc_id)
+            else:
+                target.add(doc_id, label, score)
+        self._patch(patch)
+
+    def index_movie(self, movie):
+        self._patch_doc("movies", movie.movie_id, movie.title, float(movie.rating or 0))
+
+    def remove_movie(self, movie_id):
+        self._patch_doc("movies", movie_id)
+
+    def movies_rerated(self, ratings):
+        """{movie_id: rating} after a rating change, so completions stay best rated first."""
+        def patch(index):
+            for movie_id, rating in ratings.items():
+                index.indexes["movies"].rescore(movie_id, float(rating or 0))
+        self._patch(patch)
+
+    def index_person(self, person):
+        self._patch_doc("people", person.person_id, person.full_name())
+
+    def remove_person(self, person_id):
+        self._patch_doc("people", person_id)
+
+    def index_genre(self, genre):
+        self._patch_doc("genres", genre.genre_id, genre.genre_name)
+
+    def remove_genre(self, genre_id):
+        self._patch_doc("genres", genre_id)
+
+    def complete(self, q, kinds=KINDS, limit=5):
+        """{kind: [(doc_id, label), ...]} for each requested kind."""
+        return self._read(lambda index: {kind: index.indexes[kind].complete(q, limit) for kind in kinds})
+
+    def stats(self):
+        return self._read(lambda index: index.stats())
+
+
+autocomplete = Autocomplete()
+
+
+def benchmark_autocomplete(index, prefixes, limit=5):
+    """Time index lookups for each prefix across all kinds; latencies in milliseconds."""
+    timings = []
+    for prefix in prefixes:
+        start = time.perf_counter()
+        for kind in KINDS:
+            index.indexes[kind].complete(prefix, limit)
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        "lookups": len(timings),
+        **latency_percentiles(timings, digits=3),
+    }
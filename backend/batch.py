@@ -0,0 +1,63 @@
+from serializers import MOVIE_RELATIONS, serialize_movie_ids, serialize_person_ids
+
+MAX_BATCH_IDS = 100
+
+# kind -> (id field, scalar fields, relation fields)
+BATCH_FIELDS = {
+    "movies": ("movie_id", ("title", "release_year", "duration", "rating"), MOVIE_RELATIONS),
+    "people": ("person_id", ("name",), ("movies",)),
+}
+
+
+class InvalidBatch(ValueError):
+    pass
+
+
+def parse_ids(value, maximum=MAX_BATCH_IDS):
+    if not isinstance(value, list) or not value:
+        raise InvalidBatch("ids must be a non-empty list of integers")
+    if len(value) > maximum:
+        raise InvalidBatch(f"at most {maximum} ids per request")
+    if not all(isinstance(i, int) and not isinstance(i, bool) for i in value):
+        raise InvalidBatch("ids must be a non-empty list of integers")
+    return list(dict.fromkeys(value))
+
+
+def parse_fields(kind, value):
+    """Return the requested field names, or None for the full objects.
+
+    Accepts a comma-separated string (?fields=title,genres) or a list.
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
+        value = value.split(",")
+    if not isinstance(value, list) or not all(isinstance(f, str) for f in value):
+        raise InvalidBatch("fields must be a list or comma-separated string")
+    id_field, scalars, relations = BATCH_FIELDS[kind]
+    allowed = (id_field,) + scalars + relations
+    fields = [f.strip() for f in value if f.strip()]
+    unknown = [f for f in fields if f not in allowed]
+    if unknown:
+        raise InvalidBatch(f"unknown fields: {', '.join(unknown)}; allowed: {', '.join(allowed)}")
+    return set(fields)
+
+
+def load_batch(kind, ids, fields=None):
+    """Hydrate up to MAX_BATCH_IDS objects with IN-list queries.
+
+    Returns (items, missing): items in the order of ids, then the ids
+    that do not exist. Relations left out of `fields` are never queried,
+    so ?fields=title costs a single query. The id is always included.
+    """
+    id_field, scalars, relations = BATCH_FIELDS[kind]
+    wanted = set(relations) if fields is None else fields & set(relations)
+    if kind == "movies":
+        items = serialize_movie_ids(ids, include_relations=wanted)
+    else:
+        items = serialize_person_ids(ids, include_movies="movies" in wanted)
+    if fields is not None:
+        keep = fields | {id_field}
+        items = [{k: v for k, v in d.items() if k in keep} for d in items]
+    found = {d[id_field] for d in items}
+    return items, [i for i in ids if i not in found]
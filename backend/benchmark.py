@@ -0,0 +1,383 @@
+import json
+import random
+import re
+import subprocess
+import time
+import tracemalloc
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from sqlalchemy import func
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy.engine import Engine
+from models import db, Movie, Person, Genre, MovieGenre, MoviePerson
+from querycount import QueryCounter
+from serializers import movie_rows, serialize_movies
+from fastjson import OrjsonProvider
+
+SAMPLE_SIZE = 200
+SERVER_TIMING_QUERIES = re.compile(r'desc="(\d+) queries"')
+
+
+class Sample:
+    """Ids and values the scenarios draw their requests from.
+
+    Half of the people are the most credited ones, so the graph and
+    filmography endpoints see the heavy entries as well as typical ones.
+    """
+
+    def __init__(self, rng, size=SAMPLE_SIZE):
+        self.movie_ids = self._ids(rng, Movie.movie_id, size)
+        popular = [
+            pid for (pid,) in db.session.query(MoviePerson.person_id)
+            .group_by(MoviePerson.person_id)
+            .order_by(func.count().desc())
+            .limit(size // 2)
+        ]
+        self.person_ids = popular + self._ids(rng, Person.person_id, size - len(popular))
+        names = db.session.query(Person.last_name).filter(Person.person_id.in_(self.person_ids))
+        self.names = sorted({n for (n,) in names if n})
+        self.genres = db.session.query(Genre.genre_id, Genre.genre_name).all()
+        self.years = [y for (y,) in db.session.query(Movie.release_year).filter(
+            Movie.release_year.isnot(None)).distinct()]
+        titles = db.session.query(Movie.title).filter(Movie.movie_id.in_(self.movie_ids))
+        self.words = sorted({w for (t,) in titles for w in t.split() if len(w) > 2})
+        if not (self.movie_ids and self.person_ids and self.genres and self.years and self.words and self.names):
+            raise ValueError("the catalogue is empty; run `flask --app app seed` first")
+
+    @staticmethod
+    def _ids(rng, pk, size):
+        """Up to `size` existing ids, sampled without reading the whole table."""
+        high = db.session.query(func.max(pk)).scalar() or 0
+        candidates = rng.sample(range(1, high + 1), min(high, size * 2))
+        found = [i for (i,) in db.session.query(pk).filter(pk.in_(candidates))]
+        return sorted(found)[:size]
+
+
+def _genre_name(s, rng):
+    return rng.choice(s.genres)[1]
+
+
+# name -> (sample, rng) -> (method, path, JSON body or None).
+# Read endpoints only, so runs are repeatable against the same catalogue.
+SCENARIOS = {
+    "movies_page": lambda s, rng: ("GET", f"/movies?page={rng.randint(1, 20)}&per_page=20", None),
+    "movies_cursor": lambda s, rng: ("GET", f"/movies?cursor=&sort={rng.choice(['title', 'rating', 'release_year'])}", None),
+    "movies_filtered": lambda s, rng: (
+        "GET", f"/movies?cursor=&genre={_genre_name(s, rng)}&rating_min={rng.randint(4, 8)}", None),
+    "movies_facets": lambda s, rng: (
+        "GET", f"/movies?genre={_genre_name(s, rng)}&year_min={rng.choice(s.years)}&facets=genre,decade", None),
+    "movie_detail": lambda s, rng: ("GET", f"/movies/{rng.choice(s.movie_ids)}", None),
+    "movie_similar": lambda s, rng: ("GET", f"/movies/{rng.choice(s.movie_ids)}/similar", None),
+    "movies_top_rated": lambda s, rng: ("GET", "/movies/top-rated", None),
+    "movies_by_year": lambda s, rng: ("GET", f"/movies/by-year/{rng.choice(s.years)}", None),
+    "movies_years": lambda s, rng: ("GET", "/movies/years", None),
+    "movies_stats": lambda s, rng: ("GET", "/movies/stats", None),
+    "stats_genres": lambda s, rng: ("GET", "/stats/genres", None),
+    "stats_years": lambda s, rng: ("GET", "/stats/years", None),
+    "genres": lambda s, rng: ("GET", "/genres", None),
+    "genre_movies": lambda s, rng: ("GET", f"/genres/{rng.choice(s.genres)[0]}/movies", None),
+    "people": lambda s, rng: ("GET", "/people", None),
+    "people_by_name": lambda s, rng: ("GET", f"/people?name={rng.choice(s.names)}", None),
+    "person_detail": lambda s, rng: ("GET", f"/people/{rng.choice(s.person_ids)}", None),
+    "person_collaborators": lambda s, rng: ("GET", f"/people/{rng.choice(s.person_ids)}/collaborators", None),
+    "person_co_stars": lambda s, rng: ("GET", f"/people/{rng.choice(s.person_ids)}/co-stars", None),
+    "person_path": lambda s, rng: (
+        "GET", f"/people/{rng.choice(s.person_ids)}/path/{rng.choice(s.person_ids)}", None),
+    "roles": lambda s, rng: ("GET", "/roles", None),
+    "search": lambda s, rng: ("GET", f"/search?q={rng.choice(s.words)}", None),
+    "autocomplete": lambda s, rng: ("GET", f"/autocomplete?q={rng.choice(s.words)[:rng.randint(1, 4)]}", None),
+    "movies_batch": lambda s, rng: ("POST", "/movies/batch", {"ids": rng.sample(s.movie_ids, min(50, len(s.movie_ids)))}),
+    "people_batch": lambda s, rng: ("POST", "/people/batch", {"ids": rng.sample(s.person_ids, min(50, len(s.person_ids)))}),
+}
+
+
+def percentile(values, p, digits=2):
+    """p-th quantile (0..1) of already sorted values, rounded."""
+    return round(values[min(len(values) - 1, int(len(values) * p))], digits)
+
+
+def latency_percentiles(timings, digits=2):
+    """p50/p95/p99/max of a list of latencies in milliseconds."""
+    timings = sorted(timings)
+    return {
+        "p50_ms": percentile(timings, 0.50, digits),
+        "p95_ms": percentile(timings, 0.95, digits),
+        "p99_ms": percentile(timings, 0.99, digits),
+        "max_ms": round(timings[-1], digits),
+    }
+
+
+def summarize(latencies, queries, statuses, elapsed):
+    """Throughput, latency percentiles (ms) and queries per request for one scenario."""
+    latencies = sorted(latencies)
+    counted = [q for q in queries if q is not None]
+    return {
+        "requests": len(latencies),
+        "errors": sum(n for status, n in statuses.items() if int(status) >= 500),
+        "statuses": dict(sorted(statuses.items())),
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else None,
+        "p50_ms": percentile(latencies, 0.50),
+        "p95_ms": percentile(latencies, 0.95),
+        "p99_ms": percentile(latencies, 0.99),
+        "mean_ms": round(sum(latencies) / len(latencies), 2),
+        "queries_per_request": round(sum(counted) / len(counted), 2) if counted else None,
+    }
+
+
+def _plan(name, sample, count, seed):
+    rng = random.Random(f"{seed}:{name}")
+    return [SCENARIOS[name](sample, rng) for _ in range(count)]
+
+
+def run_in_process(app, sample, names, requests, warmup, seed):
+    """Drive each scenario through app.test_client(), one request at a time.
+
+    Statements are counted on every engine, so reads sent to a replica
+    are included.
+    """
+    client = app.test_client()
+    results = {}
+    for name in names:
+        plan = _plan(name, sample, warmup + requests, seed)
+        for method, path, body in plan[:warmup]:
+            client.open(path, method=method, json=body)
+        latencies, queries, statuses = [], [], {}
+        started = time.perf_counter()
+        for method, path, body in plan[warmup:]:
+            with QueryCounter(Engine) as counter:
+                t0 = time.perf_counter()
+                response = client.open(path, method=method, json=body)
+                latencies.append((time.perf_counter() - t0) * 1000)
+            queries.append(counter.count)
+            status = str(response.status_code)
+            statuses[status] = statuses.get(status, 0) + 1
+        results[name] = summarize(latencies, queries, statuses, time.perf_counter() - started)
+    return results
+
+
+def _http_request(base_url, method, path, body, timeout):
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(base_url.rstrip("/") + path, data=data, method=method)
+    if data is not None:
+        req.add_header("Content-Type", "application/json")
+    t0 = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as response:
+            response.read()
+            status, headers = response.status, response.headers
+    except urllib.error.HTTPError as e:
+        e.read()
+        status, headers = e.code, e.headers
+    except (urllib.error.URLError, OSError):
+        status, headers = 599, {}
+    elapsed = (time.perf_counter() - t0) * 1000
+    m = SERVER_TIMING_QUERIES.search(headers.get("Server-Timing", "") or "")
+    return elapsed, int(m.group(1)) if m else None, status
+
+
+def run_http(base_url, sample, names, requests, warmup, seed, concurrency=8, timeout=30):
+    """Drive each scenario against a running server with `concurrency` clients.
+
+    Queries per request come from the Server-Timing header, so they are
+    only reported when the server runs with PROFILING_ENABLED=true.
+    """
+    results = {}
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for name in names:
+            plan = _plan(name, sample, warmup + requests, seed)
+
+            def send(item):
+                return _http_request(base_url, *item, timeout)
+
+            list(pool.map(send, plan[:warmup]))
+            started = time.perf_counter()
+            measured = list(pool.map(send, plan[warmup:]))
+            elapsed = time.perf_counter() - started
+            statuses = {}
+            for _, _, status in measured:
+                statuses[str(status)] = statuses.get(str(status), 0) + 1
+            results[name] = summarize(
+                [m[0] for m in measured], [m[1] for m in measured], statuses, elapsed
+            )
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def catalogue_size():
+    return {
+        "movies": db.session.query(func.count(Movie.movie_id)).scalar(),
+        "people": db.session.query(func.count(Person.person_id)).scalar(),
+        "genres": db.session.query(func.count(Genre.genre_id)).scalar(),
+        "movie_genres": db.session.query(func.count()).select_from(MovieGenre).scalar(),
+        "credits": db.session.query(func.count()).select_from(MoviePerson).scalar(),
+    }
+
+
+def run_benchmark(app, names=None, requests=200, warmup=20, seed=1, url=None, concurrency=8):
+    """Run the scenarios and return the JSON-serializable report.
+
+    Request ids are sampled from the app's database, so for HTTP runs
+    point the app and the server at the same catalogue. Same seed and
+    catalogue give the same request sequence on every run.
+    """
+    names = list(names or SCENARIOS)
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        raise ValueError(f"unknown scenarios: {', '.join(unknown)}")
+    with app.app_context():
+        sample = Sample(random.Random(seed))
+        meta = {
+            "commit": _git_commit(),
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "mode": "http" if url else "in-process",
+            "url": url,
+            "database": db.engine.dialect.name,
+            "requests": requests,
+            "warmup": warmup,
+            "concurrency": concurrency if url else 1,
+            "seed": seed,
+            "catalogue": catalogue_size(),
+        }
+        db.session.remove()
+    if url:
+        results = run_http(url, sample, names, requests, warmup, seed, concurrency)
+    else:
+        results = run_in_process(app, sample, names, requests, warmup, seed)
+    return {"meta": meta, "scenarios": results}
+
+
+def compare(old, new, threshold=0.2):
+    """Per-scenario changes between two reports.
+
+    A scenario regresses when its p95 grows by more than `threshold`
+    (a fraction), it runs more queries per request, or it has errors it
+    did not have before.
+    """
+    rows = []
+    for name, after in new["scenarios"].items():
+        before = old["scenarios"].get(name)
+        if before is None:
+            continue
+        reasons = []
+        if before["p95_ms"] and after["p95_ms"] > before["p95_ms"] * (1 + threshold):
+            reasons.append("p95")
+        if (before["queries_per_request"] is not None and after["queries_per_request"] is not None
+                and after["queries_per_request"] > before["queries_per_request"]):
+            reasons.append("queries")
+        if after["errors"] > before["errors"]:
+            reasons.append("errors")
+        rows.append({
+            "scenario": name,
+            "p95_ms": [before["p95_ms"], after["p95_ms"]],
+            "rps": [before["rps"], after["rps"]],
+            "queries_per_request": [before["queries_per_request"], after["queries_per_request"]],
+            "regressed": reasons,
+        })
+    return rows
+
+
+def serialization_benchmark(app, items=100, rounds=200, include_relations=False):
+    """Time one page of movies, old path against new, in ms per page.
+
+    "orm_stdlib" loads Movie objects, builds dicts with to_dict() and
+    encodes with Flask's default provider (how list endpoints used to
+    work); "rows_orjson" selects movie_rows and encodes with orjson.
+    Each is split into load (query, objects, dicts) and encode.
+    """
+    with app.app_context():
+        stdlib, fast = DefaultJSONProvider(app), OrjsonProvider(app)
+        q = Movie.query.order_by(Movie.movie_id).limit(items)
+
+        def orm_load():
+            movies = q.all()
+            if include_relations:
+                return serialize_movies(movies, include_relations=True)
+            return [m.to_dict(include_relations=False) for m in movies]
+
+        def rows_load():
+            return serialize_movies(movie_rows(q).all(), include_relations=include_relations)
+
+        results = {}
+        for name, load, provider in [("orm_stdlib", orm_load, stdlib), ("rows_orjson", rows_load, fast)]:
+            load()  # warm up
+            load_ms = encode_ms = 0.0
+            for _ in range(rounds):
+                db.session.expunge_all()
+                t0 = time.perf_counter()
+                data = load()
+                t1 = time.perf_counter()
+                provider.response(data).get_data()
+                t2 = time.perf_counter()
+                load_ms += (t1 - t0) * 1000
+                encode_ms += (t2 - t1) * 1000
+            results[name] = {
+                "load_ms": round(load_ms / rounds, 3),
+                "encode_ms": round(encode_ms / rounds, 3),
+                "total_ms": round((load_ms + encode_ms) / rounds, 3),
+            }
+        results["speedup"] = round(results["orm_stdlib"]["total_ms"] / results["rows_orjson"]["total_ms"], 2)
+        results.update(items=items, rounds=rounds, include_relations=include_relations)
+        db.session.remove()
+    return results
+
+
+def relation_memory_check(app, max_kb=4096):
+    """Peak Python memory of the relation listings on their largest entries.
+
+    Requests the most popular genre, the busiest year and the most
+    credited person in-process, as a default page and as ?stream=true,
+    and measures the tracemalloc peak of each request, response body
+    included. A listing that loads a whole relation again grows with
+    the catalogue and goes over max_kb; paged and streamed ones do not.
+    Returns {"checks": [...], "failed": [...]}.
+    """
+    with app.app_context():
+        genre_id = (
+            db.session.query(MovieGenre.genre_id).group_by(MovieGenre.genre_id)
+            .order_by(func.count().desc()).limit(1).scalar()
+        )
+        year = (
+            db.session.query(Movie.release_year).filter(Movie.release_year.isnot(None))
+            .group_by(Movie.release_year).order_by(func.count().desc()).limit(1).scalar()
+        )
+        person_id = (
+            db.session.query(MoviePerson.person_id).group_by(MoviePerson.person_id)
+            .order_by(func.count().desc()).limit(1).scalar()
+        )
+    paths = [f"/genres/{genre_id}/movies", f"/movies/by-year/{year}", f"/people/{person_id}"]
+    client = app.test_client()
+    checks = []
+    for path in paths:
+        for mode, url in [("page", path), ("stream", path + "?stream=true")]:
+            client.get(url).close()  # warm caches and pools outside the measurement
+            tracemalloc.start()
+            try:
+                response = client.get(url)
+                lines = body_bytes = 0
+                for chunk in response.response:
+                    # consumed chunk by chunk, the way a WSGI server writes it
+                    body_bytes += len(chunk)
+                    lines += chunk.count(b"\n")
+                response.close()
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+            checks.append({
+                "url": url,
+                "mode": mode,
+                "status": response.status_code,
+                "body_kb": round(body_bytes / 1024, 1),
+                "peak_kb": round(peak / 1024, 1),
+            })
+    failed = [c["url"] for c in checks if c["peak_kb"] > max_kb or c["status"] != 200]
+    return {"max_kb": max_kb, "checks": checks, "failed": failed}
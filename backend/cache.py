@@ -0,0 +1,158 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+class LocalCache:
+    """In-process LRU cache with a per-entry TTL.
+
+    Each gunicorn worker has its own copy, so writes served by another
+    worker are only seen here once the TTL runs out. Use SharedCache when
+    that staleness window is too long.
+    """
+
+    def __init__(self, max_entries=1024, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return entry
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def size(self):
+        return len(self._data)
+
+
+class SharedCache:
+    """Cache shared by all workers, stored in a Redis-compatible client.
+
+    `client` needs get(key), set(key, value, ex=seconds), delete(*keys)
+    and scan_iter(match=pattern); tests can pass any local stand-in with
+    those methods. Values are stored as JSON under `prefix`.
+    """
+
+    def __init__(self, client, ttl=300, prefix="moviedb:"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+        self.evictions = 0  # evictions happen server-side and are not visible here
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        if raw is None:
+            return None
+        return (None, json.loads(raw))
+
+    def set(self, key, value):
+        self.client.set(self.prefix + key, json.dumps(value, default=str), ex=self.ttl)
+
+    def delete(self, *keys):
+        if keys:
+            self.client.delete(*[self.prefix + k for k in keys])
+
+    def clear(self):
+        """Delete every key under this app's prefix (after bulk loads), in batches."""
+        batch = []
+        for key in self.client.scan_iter(match=self.prefix + "*", count=500):
+            batch.append(key)
+            if len(batch) >= 500:
+                self.client.delete(*batch)
+                batch = []
+        if batch:
+            self.client.delete(*batch)
+
+    def size(self):
+        return None
+
+
+class Cache:
+    """Read-through cache for small catalogue responses.
+
+    Route handlers call get_or_set(key, loader); write routes call
+    invalidate(key, ...) after a successful commit.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        kind = app.config.get("CACHE_BACKEND", "local")
+        ttl = app.config.get("CACHE_TTL", 300)
+        if kind == "redis":
+            import redis  # optional dependency, only needed for the shared backend
+            client = redis.Redis.from_url(app.config["CACHE_REDIS_URL"])
+            self.backend = SharedCache(client, ttl=ttl)
+        elif kind == "none":
+            self.backend = None
+        else:
+            self.backend = LocalCache(app.config.get("CACHE_MAX_ENTRIES", 1024), ttl)
+
+    def get_or_set(self, key, loader):
+        if self.backend is None:
+            return loader()
+        entry = self.backend.get(key)
+        if entry is not None:
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        value = loader()
+        self.backend.set(key, value)
+        return value
+
+    def invalidate(self, *keys):
+        if self.backend is not None:
+            self.backend.delete(*keys)
+
+    def clear(self):
+        if self.backend is not None:
+            self.backend.clear()
+
+    def stats(self):
+        backend = self.backend
+        return {
+            "backend": type(backend).__name__ if backend else None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": backend.evictions if backend else 0,
+            "entries": backend.size() if backend else 0,
+        }
+
+
+cache = Cache()
+
+# Keys for cached endpoints
+GENRES = "genres"
+ROLES = "roles"
+MOVIE_YEARS = "movies:years"
+MOVIE_STATS = "movies:stats"
@@ -0,0 +1,110 @@
+import hashlib
+from datetime import timezone
+from flask import g, request
+import versions
+
+# endpoint -> (entity, view arg holding its id); other GETs use the catalogue version
+ENTITY_ENDPOINTS = {
+    "movie_detail": ("movie", "movie_id"),
+    "person_detail": ("person", "person_id"),
+}
+SKIP_ENDPOINTS = {"health", "cache_stats", "pool_stats", "metrics", "export_movies", "autocomplete_lookup", "rating_stats", "static"}
+# Routes answered from this worker's LocalCache or in-memory indexes, which
+# can lag the database: their ETag is a hash of the body actually sent,
+# checked after the view runs. endpoint -> query arg that selects that
+# path (None: always).
+BODY_ETAG_ENDPOINTS = {
+    "list_genres": None,
+    "list_roles": None,
+    "get_movie_years": None,
+    "movie_stats": None,
+    "search_all": None,
+    "list_movies": "search",
+    "list_people": "name",
+    "similar_to_movie": None,
+    "person_collaborators": None,
+    "person_co_stars": None,
+    "person_path": None,
+}
+
+
+def _body_validated():
+    if request.endpoint not in BODY_ETAG_ENDPOINTS:
+        return False
+    arg = BODY_ETAG_ENDPOINTS[request.endpoint]
+    return arg is None or bool(request.args.get(arg))
+
+
+def body_etag(salt, body):
+    return hashlib.sha1(salt.encode() + b":" + body).hexdigest()[:20]
+
+
+def _validator(salt):
+    entity, arg = ENTITY_ENDPOINTS.get(request.endpoint, (None, None))
+    if entity:
+        entity_id = request.view_args[arg]
+    else:
+        entity, entity_id = versions.CATALOGUE
+    version, updated_at = versions.current(entity, entity_id)
+    return make_validator(salt, entity, entity_id, version, updated_at)
+
+
+def make_validator(salt, entity, entity_id, version, updated_at):
+    etag = hashlib.sha1(f"{salt}:{entity}:{entity_id}:{version}".encode()).hexdigest()[:20]
+    if updated_at is not None:
+        updated_at = updated_at.replace(tzinfo=timezone.utc, microsecond=0)
+    return etag, updated_at
+
+
+def init_app(app):
+    """Strong ETags and Last-Modified for GET routes, with early 304s.
+
+    The validator comes from entityversion (one primary-key read), so a
+    matching If-None-Match is answered before the view runs. A write
+    landing between the check and the view can only make the body newer
+    than its ETag, which costs a later 200, never a stale 304.
+
+    BODY_ETAG_ENDPOINTS serve per-worker copies that may be older than
+    the database version, so they run the view and hash the body
+    instead, with no Last-Modified.
+    """
+    cache_control = app.config.get("HTTP_CACHE_CONTROL", "public, max-age=0, must-revalidate")
+    salt = app.config.get("ETAG_SALT", "")
+
+    @app.before_request
+    def check_conditional():
+        if request.method != "GET" or request.endpoint in SKIP_ENDPOINTS or request.endpoint is None:
+            return None
+        if _body_validated():
+            g.validator = None
+            return None
+        etag, last_modified = _validator(salt)
+        g.validator = (etag, last_modified)
+        if request.if_none_match:
+            fresh = request.if_none_match.contains(etag)
+        else:
+            since = request.if_modified_since
+            fresh = bool(since and last_modified and last_modified <= since)
+        if fresh:
+            response = app.response_class(status=304)
+            _set_headers(response, etag, last_modified, cache_control)
+            return response
+        return None
+
+    @app.after_request
+    def add_validators(response):
+        if "validator" not in g or response.status_code != 200:
+            return response
+        validator = g.pop("validator")
+        if validator is None:
+            _set_headers(response, body_etag(salt, response.get_data()), None, cache_control)
+            return response.make_conditional(request)
+        _set_headers(response, *validator, cache_control)
+        return response
+
+
+def _set_headers(response, etag, last_modified, cache_control):
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.headers["Cache-Control"] = cache_control
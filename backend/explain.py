@@ -0,0 +1,83 @@
+import re
+from sqlalchemy import event
+from models import db
+
+# (path, table that must be reached through an index)
+EXPLAIN_CHECKS = [
+    ("/movies?cursor=&sort=title", "movie"),
+    ("/movies/top-rated", "movie"),
+    ("/movies/by-year/2014", "movie"),
+    ("/movies?cursor=&genre=Action", "genre"),
+    ("/genres/1/movies", "moviegenre"),
+    ("/people/1", "movieperson"),
+]
+
+
+def capture_selects(app, path):
+    """Run GET path through the test client and return its SELECTs as (sql, params)."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    event.listen(db.engine, "before_cursor_execute", record)
+    try:
+        app.test_client().get(path)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record)
+    return statements
+
+
+# "SCAN movie" since SQLite 3.36, "SCAN TABLE movie" before it
+SQLITE_SCAN = re.compile(r"SCAN (?:TABLE )?(\w+)")
+
+
+def sqlite_scans(details, limited):
+    """Tables read in full according to the detail column of EXPLAIN QUERY PLAN."""
+    scans = set()
+    for detail in details:
+        m = SQLITE_SCAN.match(detail)
+        if m and not (limited and "INDEX" in detail):
+            scans.add(m.group(1))
+    return scans
+
+
+def full_scans(conn, statement, parameters):
+    """Tables the plan for one statement reads in full.
+
+    Walking a whole index only counts as a scan when there is no LIMIT
+    to stop it: that is how an ORDER BY ... LIMIT page should be served.
+    """
+    limited = re.search(r"\bLIMIT\b", statement, re.I) is not None
+    if conn.dialect.name == "sqlite":
+        plan = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()
+        return sqlite_scans((row[-1] for row in plan), limited)
+    plan = conn.exec_driver_sql("EXPLAIN " + statement, parameters).mappings().all()
+    return {
+        row["table"] for row in plan
+        if row["type"] == "ALL" or (row["type"] == "index" and not limited)
+    }
+
+
+def check_indexes(app, checks=EXPLAIN_CHECKS):
+    """EXPLAIN every query the checked endpoints run.
+
+    Returns a list of failures, one per (path, statement) whose plan
+    scans the table the check names. Run it against a catalogue of
+    realistic size: MySQL prefers a scan on tables of a few dozen rows
+    whatever indexes exist.
+    """
+    failures = []
+    with app.app_context():
+        for path, table in checks:
+            app.test_client().get(path)  # warm up: one-time setup queries, search index
+            statements = [s for s in capture_selects(app, path) if re.search(rf"\b{table}\b", s[0])]
+            if not statements:
+                failures.append({"path": path, "table": table, "error": "no query touched the table"})
+                continue
+            with db.engine.connect() as conn:
+                for statement, parameters in statements:
+                    if table in full_scans(conn, statement, parameters):
+                        failures.append({"path": path, "table": table, "statement": " ".join(statement.split())})
+    return failures
@@ -0,0 +1,77 @@
+from sqlalchemy import exists, or_
+from sqlalchemy.orm import aliased
+from models import db, Movie, MovieGenre, MoviePerson, EntityVersion
+from serializers import movie_rows, serialize_movies
+
+EXPORT_CHUNK_SIZE = 1000
+
+
+def _changed_since(since):
+    """Movies whose row, genre links, credits, genres or people changed since `since`."""
+    movie_v, person_v, genre_v = (aliased(EntityVersion) for _ in range(3))
+    return or_(
+        exists().where(
+            movie_v.entity == "movie",
+            movie_v.entity_id == Movie.movie_id,
+            movie_v.updated_at >= since,
+        ),
+        exists().where(
+            MoviePerson.movie_id == Movie.movie_id,
+            person_v.entity == "person",
+            person_v.entity_id == MoviePerson.person_id,
+            person_v.updated_at >= since,
+        ),
+        exists().where(
+            MovieGenre.movie_id == Movie.movie_id,
+            genre_v.entity == "genre",
+            genre_v.entity_id == MovieGenre.genre_id,
+            genre_v.updated_at >= since,
+        ),
+    )
+
+
+def iter_movie_export(updated_since=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield every movie with genres and credits, in movie_id order.
+
+    Walks the table in movie_id keyset chunks; each chunk costs three
+    queries (movies, genres, credits) and is released from the session
+    before the next, so memory stays flat however large the catalogue.
+    With updated_since, only movies touched since then are exported,
+    followed by {"movie_id": ..., "deleted": true} for removed movies.
+    """
+    q = Movie.query
+    if updated_since is not None:
+        q = q.filter(_changed_since(updated_since))
+    last_id = 0
+    while True:
+        movies = (
+            movie_rows(q.filter(Movie.movie_id > last_id))
+            .order_by(Movie.movie_id)
+            .limit(chunk_size)
+            .all()
+        )
+        if not movies:
+            break
+        last_id = movies[-1].movie_id
+        yield from serialize_movies(movies, include_relations=True)
+        db.session.expunge_all()
+
+    if updated_since is not None:
+        last_id = 0
+        while True:
+            ids = [
+                movie_id for (movie_id,) in db.session.query(EntityVersion.entity_id)
+                .filter(
+                    EntityVersion.entity == "movie",
+                    EntityVersion.deleted.is_(True),
+                    EntityVersion.updated_at >= updated_since,
+                    EntityVersion.entity_id > last_id,
+                )
+                .order_by(EntityVersion.entity_id)
+                .limit(chunk_size)
+            ]
+            if not ids:
+                break
+            last_id = ids[-1]
+            for movie_id in ids:
+                yield {"movie_id": movie_id, "deleted": True}
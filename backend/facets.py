@@ -0,0 +1,186 @@
+from collections import Counter
+from decimal import Decimal, InvalidOperation
+from sqlalchemy import exists, func
+from sqlalchemy.orm import aliased
+from models import db, Movie, Genre, MovieGenre, MoviePerson
+from search import search
+import stats
+
+FACETS = ("genre", "decade")
+
+
+class InvalidFilter(ValueError):
+    pass
+
+
+def _number(args, name, convert):
+    value = args.get(name)
+    if value in (None, ""):
+        return None
+    try:
+        return convert(value)
+    except (ValueError, InvalidOperation):
+        raise InvalidFilter(f"{name} must be a number")
+
+
+def _range(args, name, convert=int):
+    low, high = _number(args, f"{name}_min", convert), _number(args, f"{name}_max", convert)
+    if low is not None and high is not None and low > high:
+        raise InvalidFilter(f"{name}_min must not be greater than {name}_max")
+    return low, high
+
+
+def _list(args, name):
+    """Values of a repeated (?genre=a&genre=b) or comma-separated (?genre=a,b) parameter."""
+    values = []
+    for raw in args.getlist(name):
+        values.extend(v.strip() for v in raw.split(",") if v.strip())
+    return list(dict.fromkeys(values))
+
+
+class MovieFilters:
+    """The GET /movies filters, compiled to conditions on Movie.
+
+    Relation filters are EXISTS subqueries rather than joins, so a movie
+    matching several genres or credits is still one row, and COUNT(*),
+    keyset pages and facet GROUP BYs need no DISTINCT.
+    """
+
+    def __init__(self, search_term=None, genres=(), genre_match="any", year=(None, None),
+                 rating=(None, None), duration=(None, None), people=(), role_id=None):
+        self.search_term = search_term
+        self.genres = list(genres)
+        self.genre_match = genre_match
+        self.year = year
+        self.rating = rating
+        self.duration = duration
+        self.people = list(people)
+        self.role_id = role_id
+
+    @classmethod
+    def from_args(cls, args, role_id=None):
+        genre_match = args.get("genre_match", "any")
+        if genre_match not in ("any", "all"):
+            raise InvalidFilter("genre_match must be any or all")
+        try:
+            people = [int(p) for p in _list(args, "person")]
+        except ValueError:
+            raise InvalidFilter("person must be a person_id")
+        if role_id is not None and not people:
+            raise InvalidFilter("role requires person")
+        return cls(
+            search_term=args.get("search") or None,
+            genres=_list(args, "genre"),
+            genre_match=genre_match,
+            year=_range(args, "year"),
+            rating=_range(args, "rating", Decimal),
+            duration=_range(args, "duration"),
+            people=people,
+            role_id=role_id,
+        )
+
+    def conditions(self, exclude=None):
+        conds = []
+        if self.genres and exclude != "genre":
+            def has_genre(names):
+                # aliased, so the genre facet query's own joins stay uncorrelated
+                link, genre = aliased(MovieGenre), aliased(Genre)
+                return exists().where(
+                    link.movie_id == Movie.movie_id,
+                    genre.genre_id == link.genre_id,
+                    genre.genre_name.in_(names),
+                )
+            if self.genre_match == "all":
+                conds.extend(has_genre([name]) for name in self.genres)
+            else:
+                conds.append(has_genre(self.genres))
+        for column, (low, high) in [
+            (Movie.release_year, self.year),
+            (Movie.rating, self.rating),
+            (Movie.duration, self.duration),
+        ]:
+            if low is not None:
+                conds.append(column >= low)
+            if high is not None:
+                conds.append(column <= high)
+        # every listed person must be credited (in the role, if given)
+        for person_id in self.people:
+            credit = exists().where(
+                MoviePerson.movie_id == Movie.movie_id,
+                MoviePerson.person_id == person_id,
+            )
+            if self.role_id is not None:
+                credit = credit.where(MoviePerson.role_id == self.role_id)
+            conds.append(credit)
+        return conds
+
+    def apply(self, q, exclude=None):
+        if self.search_term:
+            q = search.filter_movies(q, self.search_term)
+        return q.filter(*self.conditions(exclude))
+
+    def unfiltered(self, exclude=None):
+        return not self.search_term and not self.conditions(exclude)
+
+    def facet_exclude(self):
+        # any-of genres are a choice between options, so their counts
+        # ignore the genre filter; all-of genres drill down instead
+        return "genre" if self.genre_match == "any" else None
+
+
+def genre_counts(filters):
+    exclude = filters.facet_exclude()
+    if filters.unfiltered(exclude):
+        per_genre = stats.summaries("genre")
+        names = dict(db.session.query(Genre.genre_id, Genre.genre_name))
+        counts = [(names[gid], row.item_count) for gid, row in per_genre.items() if gid in names]
+    else:
+        q = (
+            db.session.query(Genre.genre_name, func.count())
+            .select_from(MovieGenre)
+            .join(Genre, Genre.genre_id == MovieGenre.genre_id)
+            .join(Movie, Movie.movie_id == MovieGenre.movie_id)
+            .group_by(Genre.genre_id, Genre.genre_name)
+        )
+        counts = filters.apply(q, exclude).all()
+    return [
+        {"value": name, "count": count}
+        for name, count in sorted(counts, key=lambda c: (-c[1], c[0]))
+        if count > 0
+    ]
+
+
+def decade_counts(filters):
+    if filters.unfiltered():
+        counts = Counter()
+        for year, row in stats.summaries("year").items():
+            counts[year - year % 10] += row.item_count
+        counts = counts.items()
+    else:
+        decade = Movie.release_year - Movie.release_year % 10
+        q = (
+            db.session.query(decade, func.count())
+            .filter(Movie.release_year.isnot(None))
+            .group_by(decade)
+        )
+        counts = filters.apply(q).all()
+    return [
+        {"value": decade, "count": count}
+        for decade, count in sorted(counts, reverse=True)
+        if count > 0
+    ]
+
+
+FACET_COUNTERS = {"genre": genre_counts, "decade": decade_counts}
+
+
+def facet_counts(filters, names):
+    """{facet: [{value, count}, ...]} for the requested facets.
+
+    One GROUP BY per facet over the filtered movies; with no filters the
+    counts come from the summary table instead of the movie table.
+    """
+    unknown = [n for n in names if n not in FACET_COUNTERS]
+    if unknown:
+        raise InvalidFilter(f"unknown facets: {', '.join(unknown)}; allowed: {', '.join(FACETS)}")
+    return {name: FACET_COUNTERS[name](filters) for name in names}
@@ -0,0 +1,55 @@
+from flask.json.provider import DefaultJSONProvider
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson.
+
+    Produces the same JSON as the default provider: sorted keys,
+    Decimals as strings and dates as HTTP dates (both through Flask's
+    own fallback), except that non-ASCII text is written as UTF-8
+    rather than \\u escapes. dumps() with arguments orjson cannot honour
+    (cls, a custom separator...) falls back to the json module, so
+    callers never see a difference.
+    """
+
+    def __init__(self, app):
+        super().__init__(app)
+        import orjson  # optional dependency, only needed for JSON_BACKEND=orjson
+        self._orjson = orjson
+
+    def _options(self, indent=False):
+        orjson = self._orjson
+        # datetimes go through the fallback so they render as they always have
+        options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def encode(self, obj, indent=False):
+        """obj as UTF-8 JSON bytes."""
+        return self._orjson.dumps(obj, default=self.default, option=self._options(indent))
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return self.encode(obj).decode()
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(self.encode(obj, indent) + b"\n", mimetype=self.mimetype)
+
+
+JSON_PROVIDERS = {"stdlib": DefaultJSONProvider, "orjson": OrjsonProvider}
+
+
+def init_app(app):
+    """Install the JSON_BACKEND provider; call before profiling.init_app, which wraps it."""
+    backend = app.config.get("JSON_BACKEND", "stdlib")
+    if backend not in JSON_PROVIDERS:
+        raise ValueError(f"JSON_BACKEND must be one of {', '.join(JSON_PROVIDERS)}")
+    provider = JSON_PROVIDERS[backend](app)
+    provider.sort_keys = app.json.sort_keys
+    app.json = provider
@@ -0,0 +1,321 @@
+import bisect
+import copy
+import heapq
+import random
+import time
+from array import array
+from collections import Counter, defaultdict
+from models import db, MoviePerson
+from refresh import RefreshingIndex
+from benchmark import latency_percentiles
+
+# Overlay size at which pending edits are folded back into the arrays
+COMPACT_AFTER = 10000
+
+MAX_PATH_DEPTH = 6
+MAX_PATH_VISITED = 100000
+
+
+class SearchLimitExceeded(Exception):
+    pass
+
+
+class Adjacency:
+    """One direction of the credit graph in CSR form.
+
+    keys is sorted; the neighbours of keys[i] are
+    targets[offsets[i]:offsets[i + 1]], with their role_ids at the same
+    positions in roles. Four int arrays, so a few million credits take
+    tens of megabytes rather than a dict of lists per movie.
+    """
+
+    def __init__(self, sources=(), targets=(), roles=()):
+        order = sorted(range(len(sources)), key=sources.__getitem__)
+        self.keys = array("i")
+        self.offsets = array("i", [0])
+        self.targets = array("i", (targets[i] for i in order))
+        self.roles = array("i", (roles[i] for i in order))
+        for n, i in enumerate(order):
+            if not self.keys or self.keys[-1] != sources[i]:
+                if self.keys:
+                    self.offsets.append(n)
+                self.keys.append(sources[i])
+        if self.keys:
+            self.offsets.append(len(order))
+
+    def position(self, key):
+        """Index of key in keys, or -1."""
+        i = bisect.bisect_left(self.keys, key)
+        return i if i < len(self.keys) and self.keys[i] == key else -1
+
+    def span(self, key):
+        """(start, end) of key's neighbours in targets and roles; (0, 0) if absent."""
+        i = self.position(key)
+        return (self.offsets[i], self.offsets[i + 1]) if i >= 0 else (0, 0)
+
+    def get(self, key):
+        start, end = self.span(key)
+        return list(zip(self.targets[start:end], self.roles[start:end]))
+
+    def __len__(self):
+        return len(self.targets)
+
+
+class CreditGraph:
+    """movie -> (person, role) and person -> (movie, role) adjacency.
+
+    The arrays are immutable; credits added or removed afterwards live
+    in a small overlay that lookups merge in, until COMPACT_AFTER edits
+    trigger an in-memory rebuild of the arrays.
+    """
+
+    def __init__(self, movie_ids=(), person_ids=(), role_ids=()):
+        self.by_movie = Adjacency(movie_ids, person_ids, role_ids)
+        self.by_person = Adjacency(person_ids, movie_ids, role_ids)
+        self.added = set()  # (movie_id, person_id, role_id) not in the arrays
+        self.removed = set()  # ... in the arrays but deleted since
+        self._added_by_movie = defaultdict(set)
+        self._added_by_person = defaultdict(set)
+        self.built_at = time.monotonic()
+
+    @classmethod
+    def build(cls, chunk_size=10000):
+        movie_ids, person_ids, role_ids = array("i"), array("i"), array("i")
+        rows = db.session.query(MoviePerson.movie_id, MoviePerson.person_id, MoviePerson.role_id)
+        for movie_id, person_id, role_id in rows.yield_per(chunk_size):
+            movie_ids.append(movie_id)
+            person_ids.append(person_id)
+            role_ids.append(role_id)
+        return cls(movie_ids, person_ids, role_ids)
+
+    def __len__(self):
+        return len(self.by_movie) - len(self.removed) + len(self.added)
+
+    # -- lookups
+
+    def people_of(self, movie_id):
+        """[(person_id, role_id), ...] credited on a movie."""
+        edges = [(p, r) for p, r in self.by_movie.get(movie_id) if (movie_id, p, r) not in self.removed]
+        edges.extend(sorted(self._added_by_movie.get(movie_id, ())))
+        return edges
+
+    def movies_of(self, person_id):
+        """[(movie_id, role_id), ...] a person is credited on."""
+        edges = [(m, r) for m, r in self.by_person.get(person_id) if (m, person_id, r) not in self.removed]
+        edges.extend(sorted(self._added_by_person.get(person_id, ())))
+        return edges
+
+    def collaborators(self, person_id, as_role=None, role=None, limit=20, min_shared=1):
+        """People sharing movies with person_id, most shared movies first.
+
+        as_role restricts person_id's own credits (e.g. only the movies
+        they directed); role restricts the collaborators' credits.
+        Returns [(person_id, shared_movie_count), ...].
+        """
+        movies = {m for m, r in self.movies_of(person_id) if as_role is None or r == as_role}
+        shared = Counter()
+        for movie_id in movies:
+            shared.update({
+                p for p, r in self.people_of(movie_id)
+                if p != person_id and (role is None or r == role)
+            })
+        ranked = ((p, n) for p, n in shared.items() if n >= min_shared)
+        return heapq.nsmallest(limit, ranked, key=lambda item: (-item[1], item[0]))
+
+    def path(self, source, target, max_depth=MAX_PATH_DEPTH, max_visited=MAX_PATH_VISITED):
+        """Shortest credit chain between two people, by bidirectional BFS.
+
+        Returns [source, movie, person, movie, ..., target] (ids
+        alternating between people and movies), or None when they are
+        not connected within max_depth shared movies. Each round expands
+        the smaller frontier by one whole level, so the work is about
+        the square root of a one-sided search. Raises
+        SearchLimitExceeded once more than max_visited people have been
+        reached, which bounds the cost of hopeless queries.
+        """
+        if source == target:
+            return [source]
+        # person -> (movie_id, previous person, depth from this side)
+        parents = ({source: (None, None, 0)}, {target: (None, None, 0)})
+        frontiers = ([source], [target])
+        expanded = (set(), set())  # movies whose cast each side has already seen
+        depth = 0
+        while frontiers[0] and frontiers[1] and depth < max_depth:
+            side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+            mine, theirs = parents[side], parents[1 - side]
+            level = mine[frontiers[side][0]][2] + 1
+            best = None
+            next_frontier = []
+            for person in frontiers[side]:
+                for movie_id, _ in self.movies_of(person):
+                    if movie_id in expanded[side]:
+                        continue
+                    expanded[side].add(movie_id)
+                    for other, _ in self.people_of(movie_id):
+                        if other in mine:
+                            continue
+                        mine[other] = (movie_id, person, level)
+                        next_frontier.append(other)
+                        if other in theirs:
+                            length = level + theirs[other][2]
+                            if best is None or length < best[0]:
+                                best = (length, other)
+                if best is None and len(parents[0]) + len(parents[1]) > max_visited:
+                    raise SearchLimitExceeded(f"gave up after reaching {max_visited} people")
+            if best is not None:
+                return self._join(parents, best[1])
+            frontiers[side][:] = next_frontier
+            depth += 1
+        return None
+
+    @staticmethod
+    def _join(parents, meet):
+        chain = [meet]
+        person = meet
+        while parents[0][person][1] is not None:
+            movie_id, person, _ = parents[0][person]
+            chain[:0] = [person, movie_id]
+        person = meet
+        while parents[1][person][1] is not None:
+            movie_id, person, _ = parents[1][person]
+            chain += [movie_id, person]
+        return chain
+
+    # -- incremental updates
+
+    def fork(self):
+        """A copy sharing the arrays, with its own overlay, for copy-on-write patches."""
+        other = copy.copy(self)
+        other.added, other.removed = set(self.added), set(self.removed)
+        other._added_by_movie = defaultdict(set, {k: set(v) for k, v in self._added_by_movie.items()})
+        other._added_by_person = defaultdict(set, {k: set(v) for k, v in self._added_by_person.items()})
+        return other
+
+    def add(self, movie_id, person_id, role_id):
+        edge = (movie_id, person_id, role_id)
+        if edge in self.removed:
+            self.removed.discard(edge)
+        elif edge not in self.added and (person_id, role_id) not in self.by_movie.get(movie_id):
+            self.added.add(edge)
+            self._added_by_movie[movie_id].add((person_id, role_id))
+            self._added_by_person[person_id].add((movie_id, role_id))
+        self._maybe_compact()
+
+    def remove(self, movie_id, person_id, role_id):
+        edge = (movie_id, person_id, role_id)
+        if edge in self.added:
+            self.added.discard(edge)
+            self._added_by_movie[movie_id].discard((person_id, role_id))
+            self._added_by_person[person_id].discard((movie_id, role_id))
+        elif (person_id, role_id) in self.by_movie.get(movie_id):
+            self.removed.add(edge)
+        self._maybe_compact()
+
+    def remove_movie(self, movie_id):
+        for person_id, role_id in self.people_of(movie_id):
+            self.remove(movie_id, person_id, role_id)
+
+    def remove_person(self, person_id):
+        for movie_id, role_id in self.movies_of(person_id):
+            self.remove(movie_id, person_id, role_id)
+
+    def _maybe_compact(self):
+        if len(self.added) + len(self.removed) < COMPACT_AFTER:
+            return
+        movie_ids, person_ids, role_ids = array("i"), array("i"), array("i")
+        edges = (
+            (m, p, r) for m, start, end in zip(self.by_movie.keys, self.by_movie.offsets, self.by_movie.offsets[1:])
+            for p, r in zip(self.by_movie.targets[start:end], self.by_movie.roles[start:end])
+        )
+        for m, p, r in edges:
+            if (m, p, r) not in self.removed:
+                movie_ids.append(m)
+                person_ids.append(p)
+                role_ids.append(r)
+        for m, p, r in self.added:
+            movie_ids.append(m)
+            person_ids.append(p)
+            role_ids.append(r)
+        built_at = self.built_at
+        self.__init__(movie_ids, person_ids, role_ids)
+        self.built_at = built_at
+
+
+class Credits(RefreshingIndex):
+    """Process-wide CreditGraph, built at startup or on first use.
+
+    Patched by this worker's credit writes; other workers' writes show
+    up after CREDIT_GRAPH_REFRESH_SECONDS, when the graph is rebuilt in
+    the background (see refresh.RefreshingIndex).
+    """
+
+    refresh_setting = "CREDIT_GRAPH_REFRESH_SECONDS"
+
+    def build(self):
+        return CreditGraph.build()
+
+    def _patch_graph(self, method, *args):
+        self._patch(lambda graph: getattr(graph, method)(*args))
+
+    def add_credit(self, movie_id, person_id, role_id):
+        self._patch_graph("add", movie_id, person_id, role_id)
+
+    def remove_credit(self, movie_id, person_id, role_id):
+        self._patch_graph("remove", movie_id, person_id, role_id)
+
+    def remove_movie(self, movie_id):
+        self._patch_graph("remove_movie", movie_id)
+
+    def remove_person(self, person_id):
+        self._patch_graph("remove_person", person_id)
+
+    def people_of(self, movie_id):
+        return self._read(lambda index: index.people_of(movie_id))
+
+    def movies_of(self, person_id):
+        return self._read(lambda index: index.movies_of(person_id))
+
+    def collaborators(self, person_id, as_role=None, role=None, limit=20, min_shared=1):
+        return self._read(lambda index: index.collaborators(person_id, as_role, role, limit, min_shared))
+
+    def path(self, source, target, max_depth=MAX_PATH_DEPTH, max_visited=MAX_PATH_VISITED):
+        return self._read(lambda index: index.path(source, target, max_depth, max_visited))
+
+
+credit_graph = Credits()
+
+
+def synthetic_graph(people, movies, credits, seed=0):
+    """A CreditGraph with skewed popularity, for benchmarking without a database.
+
+    Movies are picked uniformly; people with a quadratic skew, so a few
+    thousand prolific people appear in many movies, like a real catalogue.
+    """
+    rng = random.Random(seed)
+    movie_ids, person_ids, role_ids = array("i"), array("i"), array("i")
+    for _ in range(credits):
+        movie_ids.append(rng.randrange(movies) + 1)
+        person_ids.append(int(people * rng.random() ** 2) + 1)
+        role_ids.append(1 if rng.random() < 0.8 else 2)
+    return CreditGraph(movie_ids, person_ids, role_ids)
+
+
+def benchmark_paths(graph, people, queries=200, max_depth=MAX_PATH_DEPTH,
+                    max_visited=MAX_PATH_VISITED, seed=1):
+    """Time graph.path between random pairs; latencies in milliseconds."""
+    rng = random.Random(seed)
+    timings, found, gave_up = [], 0, 0
+    for _ in range(queries):
+        a, b = rng.randrange(people) + 1, rng.randrange(people) + 1
+        start = time.perf_counter()
+        try:
+            found += graph.path(a, b, max_depth, max_visited) is not None
+        except SearchLimitExceeded:
+            gave_up += 1
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        "queries": queries,
+        "connected": found,
+        "gave_up": gave_up,
+        **latency_percentiles(timings),
+    }
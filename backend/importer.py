@@ -0,0 +1,272 @@
+import csv
+import io
+import json
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from sqlalchemy import func, insert
+from models import db, Movie, Genre, Person, Role, MovieGenre, MoviePerson
+from upsert import upsert
+import versions
+
+IMPORT_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+
+
+class RowError(ValueError):
+    pass
+
+
+def _int(row, field, required=False):
+    value = row.get(field)
+    if value in (None, ""):
+        if required:
+            raise RowError(f"{field} required")
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise RowError(f"{field} must be an integer")
+
+
+def _str(row, field, max_len, required=False):
+    value = row.get(field)
+    if value in (None, ""):
+        if required:
+            raise RowError(f"{field} required")
+        return None
+    value = str(value).strip()
+    if len(value) > max_len:
+        raise RowError(f"{field} longer than {max_len} characters")
+    return value
+
+
+def _rating(row):
+    value = row.get("rating")
+    if value in (None, ""):
+        return None
+    try:
+        rating = Decimal(str(value)).quantize(Decimal("0.1"))
+    except InvalidOperation:
+        raise RowError("rating must be a number")
+    if not 0 <= rating <= 10:
+        raise RowError("rating must be between 0 and 10")
+    return rating
+
+
+def _date(row, field):
+    value = row.get(field)
+    if value in (None, ""):
+        return None
+    try:
+        return date.fromisoformat(str(value))
+    except ValueError:
+        raise RowError(f"{field} must be an ISO date (YYYY-MM-DD)")
+
+
+def _movie(row):
+    return {
+        "movie_id": _int(row, "movie_id"),
+        "title": _str(row, "title", 100, required=True),
+        "release_year": _int(row, "release_year"),
+        "duration": _int(row, "duration"),
+        "rating": _rating(row),
+    }
+
+
+def _person(row):
+    return {
+        "person_id": _int(row, "person_id"),
+        "first_name": _str(row, "first_name", 50, required=True),
+        "last_name": _str(row, "last_name", 50, required=True),
+        "dob": _date(row, "dob"),
+    }
+
+
+def _genre(row):
+    return {
+        "genre_id": _int(row, "genre_id"),
+        "genre_name": _str(row, "genre_name", 50, required=True),
+    }
+
+
+def _credit(row):
+    return {
+        "movie_id": _int(row, "movie_id", required=True),
+        "person_id": _int(row, "person_id", required=True),
+        "role_id": _int(row, "role_id", required=True),
+    }
+
+
+def _movie_genre(row):
+    return {
+        "movie_id": _int(row, "movie_id", required=True),
+        "genre_id": _int(row, "genre_id", required=True),
+    }
+
+
+# kind -> (model, row validator, {field: referenced primary key column})
+IMPORT_KINDS = {
+    "movies": (Movie, _movie, {}),
+    "people": (Person, _person, {}),
+    "genres": (Genre, _genre, {}),
+    "credits": (MoviePerson, _credit, {
+        "movie_id": Movie.movie_id,
+        "person_id": Person.person_id,
+        "role_id": Role.role_id,
+    }),
+    "movie-genres": (MovieGenre, _movie_genre, {
+        "movie_id": Movie.movie_id,
+        "genre_id": Genre.genre_id,
+    }),
+}
+
+# kind -> {entity: field}: the entity versions a row of that kind changes
+VERSIONED_FIELDS = {
+    "movies": {"movie": "movie_id"},
+    "people": {"person": "person_id"},
+    "genres": {"genre": "genre_id"},
+    "credits": {"movie": "movie_id", "person": "person_id"},
+    "movie-genres": {"movie": "movie_id"},
+}
+
+
+def iter_ndjson(stream):
+    for line_no, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield line_no, None
+            continue
+        yield line_no, row if isinstance(row, dict) else None
+
+
+def iter_csv(stream):
+    # line 1 is the header
+    for line_no, row in enumerate(csv.DictReader(stream), start=2):
+        yield line_no, row
+
+
+def text_stream(binary):
+    return io.TextIOWrapper(binary, encoding="utf-8", newline="")
+
+
+def _missing_references(references, rows):
+    """Return {field: ids that do not exist} for one chunk, one query per field."""
+    missing = {}
+    for field, pk in references.items():
+        wanted = {r[field] for r in rows}
+        found = {v for (v,) in db.session.query(pk).filter(pk.in_(wanted))}
+        missing[field] = wanted - found
+    return missing
+
+
+def _record_versions(kind, model, rows, last_id):
+    """Touch the entity versions one chunk changed, inside its transaction.
+
+    Rows without an id get one from autoincrement, above last_id. Rows
+    skipped as duplicates are touched too, which only costs a spurious
+    revalidation.
+    """
+    for entity, field in VERSIONED_FIELDS[kind].items():
+        ids = {r[field] for r in rows if r[field] is not None}
+        if last_id is not None:
+            column = getattr(model, field)
+            ids.update(i for (i,) in db.session.query(column).filter(column > last_id))
+        versions.touch_many(entity, sorted(ids))
+
+
+def _upsert_chunk(model, pk, rows):
+    """Write rows that carry their id, replacing the fields of existing ones; returns how many existed."""
+    ids = {r[pk.key] for r in rows}
+    existing = {i for (i,) in db.session.query(pk).filter(pk.in_(ids))}
+    upsert(model.__table__, rows, {
+        field: (lambda new, field=field: new[field])
+        for field in rows[0] if field != pk.key
+    })
+    return sum(r[pk.key] in existing for r in rows)
+
+
+def import_rows(kind, rows, chunk_size=IMPORT_CHUNK_SIZE, update=False):
+    """Validate and insert (line_no, row) pairs in chunks.
+
+    Each chunk is checked (field validation plus one IN query per
+    foreign key), written with a single multi-row INSERT IGNORE and
+    committed on its own, so a bad row costs a report entry rather
+    than the whole load. Rows already present are counted as duplicates
+    and left as they are; with update, movies, people and genres given
+    with their id are upserted instead, replacing every field of an
+    existing row, and counted as updated. Credits and movie-genres have
+    nothing but their key, so update changes nothing for them. Each
+    chunk records the entity versions it changed, so ETags and
+    incremental exports see bulk loads.
+    """
+    model, validate, references = IMPORT_KINDS[kind]
+    pk = None if references else model.__mapper__.primary_key[0]
+    stmt = (
+        insert(model.__table__)
+        .prefix_with("IGNORE", dialect="mysql")
+        .prefix_with("OR IGNORE", dialect="sqlite")
+    )
+    report = {"kind": kind, "received": 0, "inserted": 0, "updated": 0, "duplicates": 0, "invalid": 0, "errors": []}
+
+    def error(line_no, message):
+        report["invalid"] += 1
+        if len(report["errors"]) < MAX_REPORTED_ERRORS:
+            report["errors"].append({"line": line_no, "error": message})
+
+    def flush(chunk):
+        if references:
+            missing = _missing_references(references, [r for _, r in chunk])
+            valid = []
+            for line_no, r in chunk:
+                bad = [f for f in references if r[f] in missing[f]]
+                if bad:
+                    error(line_no, f"unknown {', '.join(bad)}")
+                else:
+                    valid.append(r)
+        else:
+            valid = [r for _, r in chunk]
+        if not valid:
+            return
+        last_id = None
+        if pk is not None and any(r[pk.key] is None for r in valid):
+            last_id = db.session.query(func.coalesce(func.max(pk), 0)).scalar()
+        keyed, plain = [], valid
+        if update and pk is not None:
+            keyed = [r for r in valid if r[pk.key] is not None]
+            plain = [r for r in valid if r[pk.key] is None]
+        try:
+            updated = _upsert_chunk(model, pk, keyed) if keyed else 0
+            inserted = len(keyed) - updated
+            if plain:
+                result = db.session.execute(stmt, plain)
+                inserted += result.rowcount if result.rowcount >= 0 else len(plain)
+            _record_versions(kind, model, valid, last_id)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        report["inserted"] += inserted
+        report["updated"] += updated
+        report["duplicates"] += len(valid) - inserted - updated
+
+    chunk = []
+    for line_no, row in rows:
+        report["received"] += 1
+        if row is None:
+            error(line_no, "not a JSON object")
+            continue
+        try:
+            chunk.append((line_no, validate(row)))
+        except RowError as e:
+            error(line_no, str(e))
+            continue
+        if len(chunk) >= chunk_size:
+            flush(chunk)
+            chunk = []
+    if chunk:
+        flush(chunk)
+    return report
@@ -0,0 +1,143 @@
+from sqlalchemy import inspect
+from models import db, EntityVersion, MovieRating, MovieVote, SchemaMigration, SummaryStat
+from versions import utcnow
+import stats
+
+
+def _index_names(conn, table):
+    return {ix["name"] for ix in inspect(conn).get_indexes(table)}
+
+
+def _create_index(conn, table, name, columns, unique=False):
+    if name in _index_names(conn, table):
+        return
+    kind = "UNIQUE INDEX" if unique else "INDEX"
+    conn.execute(db.text(f"CREATE {kind} {name} ON {table} ({', '.join(columns)})"))
+
+
+def relationship_tables(conn):
+    """Create moviegenre and movieperson where they are missing, keeping any data."""
+    conn.execute(db.text("""
+        CREATE TABLE IF NOT EXISTS moviegenre (
+            movie_id INT NOT NULL,
+            genre_id INT NOT NULL,
+            PRIMARY KEY (movie_id, genre_id),
+            CONSTRAINT fk_moviegenre_movie FOREIGN KEY (movie_id) REFERENCES movie(movie_id),
+            CONSTRAINT fk_moviegenre_genre FOREIGN KEY (genre_id) REFERENCES genre(genre_id)
+        )
+    """))
+    conn.execute(db.text("""
+        CREATE TABLE IF NOT EXISTS movieperson (
+            movie_id INT NOT NULL,
+            person_id INT NOT NULL,
+            role_id INT NOT NULL,
+            PRIMARY KEY (movie_id, person_id, role_id),
+            CONSTRAINT fk_movieperson_movie FOREIGN KEY (movie_id) REFERENCES movie(movie_id),
+            CONSTRAINT fk_movieperson_person FOREIGN KEY (person_id) REFERENCES person(person_id),
+            CONSTRAINT fk_movieperson_role FOREIGN KEY (role_id) REFERENCES role(role_id)
+        )
+    """))
+
+
+def filter_sort_indexes(conn):
+    """Indexes for the list/sort/filter endpoints and the person -> credits lookup."""
+    _create_index(conn, "movie", "ix_movie_title", ["title", "movie_id"])
+    _create_index(conn, "movie", "ix_movie_rating", ["rating", "movie_id"])
+    _create_index(conn, "movie", "ix_movie_release_year", ["release_year", "movie_id"])
+    _create_index(conn, "movieperson", "ix_movieperson_person", ["person_id", "movie_id", "role_id"])
+    _create_index(conn, "moviegenre", "ix_moviegenre_genre", ["genre_id", "movie_id"])
+
+
+def merge_duplicate_genres(conn):
+    """Fold genres sharing a name into the one with the lowest id; returns the ids removed."""
+    duplicates = conn.execute(db.text(
+        "SELECT genre_name, MIN(genre_id) FROM genre GROUP BY genre_name HAVING COUNT(*) > 1"
+    )).all()
+    removed = []
+    for genre_name, keep in duplicates:
+        kept_movies = set(conn.execute(
+            db.text("SELECT movie_id FROM moviegenre WHERE genre_id = :g"), {"g": keep}
+        ).scalars())
+        for genre_id in conn.execute(
+            db.text("SELECT genre_id FROM genre WHERE genre_name = :n AND genre_id <> :g"),
+            {"n": genre_name, "g": keep},
+        ).scalars().all():
+            movies = set(conn.execute(
+                db.text("SELECT movie_id FROM moviegenre WHERE genre_id = :g"), {"g": genre_id}
+            ).scalars())
+            conn.execute(db.text("DELETE FROM moviegenre WHERE genre_id = :g"), {"g": genre_id})
+            if movies - kept_movies:
+                conn.execute(
+                    db.text("INSERT INTO moviegenre (movie_id, genre_id) VALUES (:m, :g)"),
+                    [{"m": m, "g": keep} for m in sorted(movies - kept_movies)],
+                )
+            kept_movies |= movies
+            conn.execute(db.text("DELETE FROM genre WHERE genre_id = :g"), {"g": genre_id})
+            removed.append(genre_id)
+    return removed
+
+
+def unique_genre_name(conn):
+    """Unique genre names; existing duplicates are merged into their lowest id first."""
+    merge_duplicate_genres(conn)
+    _create_index(conn, "genre", "uq_genre_name", ["genre_name"], unique=True)
+
+
+def movie_votes(conn):
+    """Tables behind POST /movies/<id>/ratings: raw votes and per-movie totals."""
+    MovieVote.__table__.create(conn, checkfirst=True)
+    MovieRating.__table__.create(conn, checkfirst=True)
+
+
+def summary_tables(conn):
+    """Running totals behind /movies/stats and the entity versions behind
+    ETags and incremental exports; totals are computed on creation, in
+    the migration's transaction, so they are recorded with the version."""
+    SummaryStat.__table__.create(conn, checkfirst=True)
+    EntityVersion.__table__.create(conn, checkfirst=True)
+    if not conn.execute(db.select(SummaryStat.scope).limit(1)).first():
+        stats.rebuild()
+
+
+# (version, name, function); append only, never renumber or edit an applied step
+MIGRATIONS = [
+    (1, "relationship_tables", relationship_tables),
+    (2, "filter_sort_indexes", filter_sort_indexes),
+    (3, "unique_genre_name", unique_genre_name),
+    (4, "movie_votes", movie_votes),
+    (5, "summary_tables", summary_tables),
+]
+
+
+def applied():
+    """{version: SchemaMigration} for every migration already run."""
+    SchemaMigration.__table__.create(db.engine, checkfirst=True)
+    return {m.version: m for m in SchemaMigration.query.all()}
+
+
+def pending():
+    done = applied()
+    return [(version, name) for version, name, _ in MIGRATIONS if version not in done]
+
+
+def upgrade():
+    """Apply pending migrations in order and return their names.
+
+    Every step is idempotent (IF NOT EXISTS, index lookups first), so a
+    step interrupted half way, where MySQL has already committed its DDL,
+    is safe to run again. Each version is recorded as soon as it finishes.
+    """
+    done = applied()
+    ran = []
+    for version, name, migrate in MIGRATIONS:
+        if version in done:
+            continue
+        try:
+            migrate(db.session.connection())
+            db.session.add(SchemaMigration(version=version, name=name, applied_at=utcnow()))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        ran.append(name)
+    return ran
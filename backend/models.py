@@ -1,6 +1,8 @@
 from flask_sqlalchemy import SQLAlchemy
+from replicas import RoutingSession
 
-db = SQLAlchemy()
+# RoutingSession sends reads in GET requests to replicas when configured
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 
 # Association table for Movie <-> Genre (composite PK)
 class MovieGenre(db.Model):
@@ -8,6 +10,8 @@ class MovieGenre(db.Model):
     movie_id = db.Column(db.Integer, db.ForeignKey("movie.movie_id"), primary_key=True)
     genre_id = db.Column(db.Integer, db.ForeignKey("genre.genre_id"), primary_key=True)
 
+    __table_args__ = (db.Index("ix_moviegenre_genre", "genre_id", "movie_id"),)
+
 # Association table for Movie <-> Person with Role
 class MoviePerson(db.Model):
     __tablename__ = "movieperson"
@@ -15,6 +19,9 @@ class MoviePerson(db.Model):
     person_id = db.Column(db.Integer, db.ForeignKey("person.person_id"), primary_key=True)
     role_id = db.Column(db.Integer, db.ForeignKey("role.role_id"), primary_key=True)
 
+    # the PK leads with movie_id; filmographies look credits up by person
+    __table_args__ = (db.Index("ix_movieperson_person", "person_id", "movie_id", "role_id"),)
+
 class Movie(db.Model):
     __tablename__ = "movie"
     movie_id = db.Column(db.Integer, primary_key=True)
@@ -26,42 +33,33 @@ class Movie(db.Model):
     genres = db.relationship("Genre", secondary="moviegenre", back_populates="movies")
     people = db.relationship("Person", secondary="movieperson", back_populates="movies")
 
+    # sort and filter columns; movie_id makes them match the keyset order
+    __table_args__ = (
+        db.Index("ix_movie_title", "title", "movie_id"),
+        db.Index("ix_movie_rating", "rating", "movie_id"),
+        db.Index("ix_movie_release_year", "release_year", "movie_id"),
+    )
+
     def to_dict(self, include_relations=True):
-        d = dict(
+        if include_relations:
+            # batch loader joins genres and credits instead of per-row gets
+            from serializers import serialize_movies
+            return serialize_movies([self])[0]
+        return dict(
             movie_id=self.movie_id,
             title=self.title,
             release_year=self.release_year,
             duration=self.duration,
             rating=self.rating,
         )
-        if include_relations:
-            try:
-                d["genres"] = [g.genre_name for g in self.genres]
-            except:
-                d["genres"] = []
-            
-            # include persons with roles
-            persons = []
-            try:
-                for mp in MoviePerson.query.filter_by(movie_id=self.movie_id).all():
-                    person = Person.query.get(mp.person_id)
-                    role = Role.query.get(mp.role_id)
-                    if person and role:
-                        persons.append({
-                            "person_id": person.person_id, 
-                            "name": f"{person.first_name} {person.last_name}", 
-                            "role": role.role_name
-                        })
-            except:
-                pass
-            d["people"] = persons
-        return d
 
 class Genre(db.Model):
     __tablename__ = "genre"
     genre_id = db.Column(db.Integer, primary_key=True)
     genre_name = db.Column(db.String(50), nullable=False)
 
+    __table_args__ = (db.Index("uq_genre_name", "genre_name", unique=True),)
+
     movies = db.relationship("Movie", secondary="moviegenre", back_populates="genres")
 
 class Person(db.Model):
@@ -80,3 +78,69 @@ class Role(db.Model):
     __tablename__ = "role"
     role_id = db.Column(db.Integer, primary_key=True)
     role_name = db.Column(db.String(50), nullable=False)
+
+# Raw end-user votes from POST /movies/<id>/ratings, inserted in batches
+# by the write-behind buffer in ratings.py.
+class MovieVote(db.Model):
+    __tablename__ = "movievote"
+    vote_id = db.Column(db.BigInteger().with_variant(db.Integer, "sqlite"), primary_key=True)
+    movie_id = db.Column(db.Integer, db.ForeignKey("movie.movie_id"), nullable=False)
+    score = db.Column(db.Numeric(3, 1), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (db.Index("ix_movievote_movie", "movie_id", "created_at"),)
+
+# Running vote totals; Movie.rating is vote_sum / vote_count rounded to one decimal.
+class MovieRating(db.Model):
+    __tablename__ = "movierating"
+    movie_id = db.Column(db.Integer, db.ForeignKey("movie.movie_id"), primary_key=True, autoincrement=False)
+    vote_count = db.Column(db.Integer, nullable=False, default=0)
+    vote_sum = db.Column(db.Numeric(14, 1), nullable=False, default=0)
+
+# Maintained aggregates for /movies/stats and the per-genre/per-year breakdowns.
+# scope is "all", "genre", "year", "genres" or "people"; scope_key is the
+# genre_id or release_year (0 otherwise). hist_N counts ratings in [N, N+1),
+# with 10.0 counted in hist_9.
+class SummaryStat(db.Model):
+    __tablename__ = "summarystat"
+    scope = db.Column(db.String(10), primary_key=True)
+    scope_key = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    item_count = db.Column(db.Integer, nullable=False, default=0)
+    rating_count = db.Column(db.Integer, nullable=False, default=0)
+    rating_sum = db.Column(db.Numeric(14, 1), nullable=False, default=0)
+    hist_0 = db.Column(db.Integer, nullable=False, default=0)
+    hist_1 = db.Column(db.Integer, nullable=False, default=0)
+    hist_2 = db.Column(db.Integer, nullable=False, default=0)
+    hist_3 = db.Column(db.Integer, nullable=False, default=0)
+    hist_4 = db.Column(db.Integer, nullable=False, default=0)
+    hist_5 = db.Column(db.Integer, nullable=False, default=0)
+    hist_6 = db.Column(db.Integer, nullable=False, default=0)
+    hist_7 = db.Column(db.Integer, nullable=False, default=0)
+    hist_8 = db.Column(db.Integer, nullable=False, default=0)
+    hist_9 = db.Column(db.Integer, nullable=False, default=0)
+
+    def to_dict(self):
+        avg = self.rating_sum / self.rating_count if self.rating_count else None
+        return dict(
+            movie_count=self.item_count,
+            average_rating=round(avg, 2) if avg is not None else None,
+            rating_histogram=[getattr(self, f"hist_{i}") for i in range(10)],
+        )
+
+# Change tracking for incremental exports and HTTP validators.
+# entity is "movie", "person" or "genre"; version starts at 1 and is
+# bumped on every change, deleted marks a tombstone.
+class EntityVersion(db.Model):
+    __tablename__ = "entityversion"
+    entity = db.Column(db.String(10), primary_key=True)
+    entity_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    version = db.Column(db.Integer, nullable=False, default=1)
+    updated_at = db.Column(db.DateTime, nullable=False, index=True)
+    deleted = db.Column(db.Boolean, nullable=False, default=False)
+
+# One row per applied schema migration (see migrations.py).
+class SchemaMigration(db.Model):
+    __tablename__ = "schema_migration"
+    version = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    name = db.Column(db.String(100), nullable=False)
+    applied_at = db.Column(db.DateTime, nullable=False)
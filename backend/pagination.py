@@ -0,0 +1,138 @@
+import base64
+import json
+from decimal import Decimal, InvalidOperation
+from sqlalchemy import and_, or_
+from models import Movie, MoviePerson
+
+MAX_PER_PAGE = 100
+# Relation listings (/genres/<id>/movies, /movies/by-year/<year>, /people/<id>)
+RELATION_PER_PAGE = 100
+MAX_RELATION_PER_PAGE = 500
+# Rows fetched per query when a relation listing is streamed
+STREAM_CHUNK_SIZE = 1000
+
+# sort name -> (column, descending); movie_id breaks ties so the order is total
+KEYSET_SORTS = {
+    "title": (Movie.title, False),
+    "rating": (Movie.rating, True),
+    "release_year": (Movie.release_year, True),
+    "movie_id": (Movie.movie_id, False),
+}
+# cursor key types; keys of other sorts are strings
+INT_KEY_SORTS = {"release_year", "movie_id", "credits"}
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def clamp_per_page(value, default=10, maximum=MAX_PER_PAGE):
+    try:
+        per_page = int(value) if value is not None else default
+    except (TypeError, ValueError):
+        per_page = default
+    return max(1, min(per_page, maximum))
+
+
+def encode_cursor(sort, key, movie_id):
+    if isinstance(key, Decimal):
+        key = str(key)
+    raw = json.dumps({"s": sort, "k": key, "id": movie_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token, sort):
+    """Return (key, movie_id) from a token made by encode_cursor for the same sort."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        key, movie_id = data["k"], int(data["id"])
+        if data["s"] != sort:
+            raise InvalidCursor("cursor was issued for a different sort")
+        if key is not None and sort == "rating":
+            key = Decimal(key)
+        elif key is not None and sort in INT_KEY_SORTS:
+            key = int(key)
+        elif key is not None:
+            key = str(key)
+    except InvalidCursor:
+        raise
+    except (ValueError, KeyError, TypeError, InvalidOperation):
+        raise InvalidCursor("invalid cursor")
+    return key, movie_id
+
+
+def keyset_order(q, sort):
+    column, descending = KEYSET_SORTS[sort]
+    if descending:
+        # "col IS NULL" first sorts NULLs last on both MySQL and SQLite
+        return q.order_by(column.is_(None), column.desc(), Movie.movie_id.asc())
+    return q.order_by(column.asc(), Movie.movie_id.asc())
+
+
+def keyset_after(q, sort, key, movie_id):
+    """Filter q to rows strictly after (key, movie_id) in keyset_order."""
+    column, descending = KEYSET_SORTS[sort]
+    if key is None:
+        # only reachable for descending sorts, where NULLs come last
+        return q.filter(column.is_(None), Movie.movie_id > movie_id)
+    tie = and_(column == key, Movie.movie_id > movie_id)
+    if descending:
+        return q.filter(or_(column < key, tie, column.is_(None)))
+    return q.filter(or_(column > key, tie))
+
+
+def keyset_page(q, sort, cursor, per_page):
+    """Fetch one page of movies after `cursor` (None or "" for the first page).
+
+    Returns (movies, next_cursor); next_cursor is None on the last page.
+    Cost per page is an index range scan of per_page + 1 rows, with no
+    OFFSET and no COUNT(*).
+    """
+    if sort not in KEYSET_SORTS:
+        sort = "title"
+    if cursor:
+        key, movie_id = decode_cursor(cursor, sort)
+        q = keyset_after(q, sort, key, movie_id)
+    rows = keyset_order(q, sort).limit(per_page + 1).all()
+    movies, more = rows[:per_page], len(rows) > per_page
+    next_cursor = None
+    if more:
+        last = movies[-1]
+        column, _ = KEYSET_SORTS[sort]
+        next_cursor = encode_cursor(sort, getattr(last, column.key), last.movie_id)
+    return movies, next_cursor
+
+
+def credit_page(q, cursor, per_page):
+    """keyset_page for one person's credits, in (movie_id, role_id) order.
+
+    q selects movieperson columns (at least movie_id and role_id) for a
+    single person, so the order is an index range scan of
+    movieperson (person_id, movie_id, role_id).
+    """
+    if cursor:
+        role_id, movie_id = decode_cursor(cursor, "credits")
+        q = q.filter(or_(
+            MoviePerson.movie_id > movie_id,
+            and_(MoviePerson.movie_id == movie_id, MoviePerson.role_id > role_id),
+        ))
+    rows = q.order_by(MoviePerson.movie_id, MoviePerson.role_id).limit(per_page + 1).all()
+    credits, more = rows[:per_page], len(rows) > per_page
+    next_cursor = encode_cursor("credits", credits[-1].role_id, credits[-1].movie_id) if more else None
+    return credits, next_cursor
+
+
+def iter_pages(fetch, chunk_size=STREAM_CHUNK_SIZE):
+    """Yield every page of a keyset listing, chunk_size rows at a time.
+
+    fetch(cursor, per_page) -> (rows, next_cursor), as keyset_page and
+    credit_page. Only one chunk is held at a time, so streaming a
+    listing of any length keeps memory flat.
+    """
+    cursor = None
+    while True:
+        rows, cursor = fetch(cursor, chunk_size)
+        yield rows
+        if cursor is None:
+            return
@@ -0,0 +1,155 @@
+import threading
+import time
+from flask import g, has_app_context, request
+from flask.json.provider import JSONProvider
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+SIZE_BUCKETS = (1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+
+class Histogram:
+    """Cumulative Prometheus-style histogram, one series per endpoint label."""
+
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.series = {}  # endpoint -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, endpoint, value):
+        with self._lock:
+            series = self.series.setdefault(endpoint, [0] * (len(self.buckets) + 2))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for endpoint, series in sorted(self.series.items()):
+                label = f'endpoint="{endpoint}"'
+                for bound, count in zip(self.buckets, series):
+                    lines.append(f'{self.name}_bucket{{{label},le="{bound}"}} {count}')
+                lines.append(f'{self.name}_bucket{{{label},le="+Inf"}} {series[-2]}')
+                lines.append(f"{self.name}_count{{{label}}} {series[-2]}")
+                lines.append(f"{self.name}_sum{{{label}}} {series[-1]}")
+        return "\n".join(lines)
+
+
+METRICS = [
+    Histogram("http_request_duration_seconds", "Request latency.", DURATION_BUCKETS),
+    Histogram("http_request_db_seconds", "Time spent in SQL per request.", DURATION_BUCKETS),
+    Histogram("http_request_queries", "SQL statements per request.", QUERY_BUCKETS),
+    Histogram("http_response_size_bytes", "Response body size.", SIZE_BUCKETS),
+]
+REQUEST_SECONDS, DB_SECONDS, QUERY_COUNT, RESPONSE_BYTES = METRICS
+
+
+def _profile():
+    return g.get("_profile") if has_app_context() else None
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _profile() is not None:
+        conn.info.setdefault("_profile_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _profile()
+    starts = conn.info.get("_profile_start")
+    if profile is not None and starts:
+        profile["db_time"] += time.perf_counter() - starts.pop()
+        profile["queries"] += 1
+
+
+class TimedJSONProvider(JSONProvider):
+    """Wraps the app's JSON provider, timing the serialization done by jsonify."""
+
+    def __init__(self, app, inner):
+        super().__init__(app)
+        self.inner = inner
+
+    def __getattr__(self, name):
+        # sort_keys, mimetype, encode(), ... of the wrapped provider
+        return getattr(self.inner, name)
+
+    def dumps(self, obj, **kwargs):
+        return self.inner.dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        return self.inner.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return self.inner.response(*args, **kwargs)
+        finally:
+            profile = _profile()
+            if profile is not None:
+                profile["ser_time"] += time.perf_counter() - start
+
+
+def render_metrics():
+    return "\n".join(h.render() for h in METRICS) + "\n"
+
+
+def init_app(app):
+    """Opt-in per-request profiling (PROFILING_ENABLED=true).
+
+    Records SQL statement count, DB time, JSON serialization time and
+    response size for every request. They are sent back in a
+    Server-Timing header, aggregated into per-endpoint histograms at
+    GET /metrics, and logged when a request goes over
+    PROFILE_QUERY_BUDGET statements or PROFILE_LATENCY_BUDGET_MS.
+    Call before registering other before_request hooks so their queries
+    are counted.
+    """
+    if not app.config.get("PROFILING_ENABLED"):
+        return
+    query_budget = app.config.get("PROFILE_QUERY_BUDGET", 20)
+    latency_budget = app.config.get("PROFILE_LATENCY_BUDGET_MS", 500) / 1000
+
+    app.json = TimedJSONProvider(app, app.json)
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+    @app.before_request
+    def start_profile():
+        g._profile = {"start": time.perf_counter(), "queries": 0, "db_time": 0.0, "ser_time": 0.0}
+
+    @app.after_request
+    def finish_profile(response):
+        profile = g.pop("_profile", None)
+        if profile is None:
+            return response
+        total = time.perf_counter() - profile["start"]
+        endpoint = request.endpoint or "unmatched"
+        response.headers["Server-Timing"] = ", ".join([
+            f'db;dur={profile["db_time"] * 1000:.2f};desc="{profile["queries"]} queries"',
+            f'ser;dur={profile["ser_time"] * 1000:.2f}',
+            f"total;dur={total * 1000:.2f}",
+        ])
+        REQUEST_SECONDS.observe(endpoint, total)
+        DB_SECONDS.observe(endpoint, profile["db_time"])
+        QUERY_COUNT.observe(endpoint, profile["queries"])
+        size = response.calculate_content_length()
+        if size is not None:
+            RESPONSE_BYTES.observe(endpoint, size)
+        if profile["queries"] > query_budget or total > latency_budget:
+            app.logger.warning(
+                "slow request %s %s: %d queries, %.1f ms db, %.1f ms total, %s bytes",
+                request.method, request.full_path.rstrip("?"), profile["queries"],
+                profile["db_time"] * 1000, total * 1000, size,
+            )
+        return response
+
+    @app.route("/metrics")
+    def metrics():
+        return app.response_class(render_metrics(), mimetype="text/plain; version=0.0.4")
@@ -0,0 +1,46 @@
+from contextlib import contextmanager
+from sqlalchemy import event
+from models import db
+
+
+class QueryCounter:
+    """Count SQL statements executed on an engine while the block runs.
+
+        with QueryCounter() as counter:
+            client.get("/movies/top-rated?limit=100")
+        print(counter.count, counter.statements)
+    """
+
+    def __init__(self, engine=None):
+        self.engine = engine
+        self.count = 0
+        self.statements = []
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+        self.statements.append(statement)
+
+    def __enter__(self):
+        if self.engine is None:
+            self.engine = db.engine
+        event.listen(self.engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        event.remove(self.engine, "before_cursor_execute", self._on_execute)
+        return False
+
+
+@contextmanager
+def assert_max_queries(limit, engine=None):
+    """Fail if the block issues more than `limit` SQL statements.
+
+    Use in tests to catch a regression back to per-row (N+1) queries.
+    """
+    with QueryCounter(engine) as counter:
+        yield counter
+    if counter.count > limit:
+        raise AssertionError(
+            f"expected at most {limit} queries, got {counter.count}:\n"
+            + "\n".join(counter.statements)
+        )
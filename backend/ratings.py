@@ -0,0 +1,298 @@
+import atexit
+import logging
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal, ROUND_HALF_UP, InvalidOperation
+from sqlalchemy import bindparam, insert, update
+from models import db, Movie, MovieGenre, MovieRating, MovieVote
+from cache import cache, MOVIE_STATS
+from upsert import upsert
+from search import search
+from autocomplete import autocomplete
+from similar import similar_movies
+import stats
+import versions
+
+MIN_SCORE = Decimal("0")
+MAX_SCORE = Decimal("10")
+TENTH = Decimal("0.1")
+
+log = logging.getLogger(__name__)
+
+
+class InvalidRating(ValueError):
+    pass
+
+
+class BufferFull(RuntimeError):
+    pass
+
+
+def parse_score(data):
+    """{"score": 7.5} -> Decimal("7.5"); one decimal place, 0 to 10."""
+    value = data.get("score")
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise InvalidRating("score must be a number from 0 to 10")
+    try:
+        score = Decimal(str(value)).quantize(TENTH, ROUND_HALF_UP)
+    except InvalidOperation:
+        raise InvalidRating("score must be a number from 0 to 10")
+    if not MIN_SCORE <= score <= MAX_SCORE:
+        raise InvalidRating("score must be a number from 0 to 10")
+    return score
+
+
+def write_votes(votes):
+    """Insert votes and fold them into the running totals, in one transaction.
+
+    votes: (movie_id, score, created_at) tuples. Votes for movies that no
+    longer exist are dropped. One multi-row INSERT for the raw votes, one
+    multi-row upsert for movierating, then Movie.rating, the summary
+    stats, entity versions and this worker's in-memory indexes are
+    updated only for movies whose rounded average actually changed.
+    Returns (written, dropped); commits.
+    """
+    ids = {movie_id for movie_id, _, _ in votes}
+    movies = {
+        movie_id: (rating, release_year)
+        for movie_id, rating, release_year in
+        db.session.query(Movie.movie_id, Movie.rating, Movie.release_year).filter(Movie.movie_id.in_(ids))
+    }
+    kept = [v for v in votes if v[0] in movies]
+    if not kept:
+        return 0, len(votes)
+    db.session.execute(
+        insert(MovieVote.__table__),
+        [{"movie_id": m, "score": score, "created_at": at} for m, score, at in kept],
+    )
+    totals = defaultdict(lambda: [0, Decimal(0)])
+    for movie_id, score, _ in kept:
+        totals[movie_id][0] += 1
+        totals[movie_id][1] += score
+    table = MovieRating.__table__
+    upsert(
+        table,
+        [{"movie_id": m, "vote_count": c, "vote_sum": s} for m, (c, s) in totals.items()],
+        {
+            "vote_count": lambda new: table.c.vote_count + new.vote_count,
+            "vote_sum": lambda new: table.c.vote_sum + new.vote_sum,
+        },
+    )
+    averages = {
+        movie_id: (Decimal(vote_sum) / vote_count).quantize(TENTH, ROUND_HALF_UP)
+        for movie_id, vote_count, vote_sum in
+        db.session.query(MovieRating.movie_id, MovieRating.vote_count, MovieRating.vote_sum)
+        .filter(MovieRating.movie_id.in_(list(totals)))
+    }
+    changed = sorted(m for m, avg in averages.items() if movies[m][0] is None or Decimal(movies[m][0]) != avg)
+    if changed:
+        db.session.execute(
+            update(Movie.__table__).where(Movie.movie_id == bindparam("b_movie_id")).values(rating=bindparam("b_rating")),
+            [{"b_movie_id": m, "b_rating": averages[m]} for m in changed],
+        )
+        genre_ids = defaultdict(list)
+        for movie_id, genre_id in db.session.query(MovieGenre.movie_id, MovieGenre.genre_id).filter(MovieGenre.movie_id.in_(changed)):
+            genre_ids[movie_id].append(genre_id)
+        stats.movies_rerated([(movies[m][0], averages[m], movies[m][1], genre_ids[m]) for m in changed])
+        versions.touch_many("movie", changed)
+    db.session.commit()
+    if changed:
+        cache.invalidate(MOVIE_STATS)
+        rerated = {m: float(averages[m]) for m in changed}
+        search.movies_rerated(rerated)
+        autocomplete.movies_rerated(rerated)
+        similar_movies.movies_rerated(rerated)
+    return len(kept), len(votes) - len(kept)
+
+
+class RatingBuffer:
+    """Write-behind queue for POST /movies/<id>/ratings.
+
+    Requests only append to an in-process list. A background thread
+    drains it every RATINGS_FLUSH_SECONDS, or as soon as
+    RATINGS_FLUSH_BATCH votes are waiting, through write_votes, so the
+    database sees one transaction per batch instead of one per vote.
+    Past RATINGS_MAX_PENDING queued votes submit() raises BufferFull.
+
+    A failed flush puts its batch back at the front of the queue for
+    the next attempt. The queue is flushed when the process exits
+    normally (gunicorn's graceful shutdown included); a killed worker
+    loses at most the votes of one flush interval.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.flush_seconds = 1.0
+        self.batch_size = 5000
+        self.max_pending = 100000
+        self.pending = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+        self.accepted = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed_flushes = 0
+        self.last_flush_ms = None
+        # once per buffer, however many apps init_app sees; close() uses the latest
+        atexit.register(self.close)
+
+    def init_app(self, app):
+        self.app = app
+        self.flush_seconds = app.config.get("RATINGS_FLUSH_SECONDS", 1.0)
+        self.batch_size = app.config.get("RATINGS_FLUSH_BATCH", 5000)
+        self.max_pending = app.config.get("RATINGS_MAX_PENDING", 100000)
+
+    def _ensure_flusher(self):
+        # started lazily, in the process that takes requests: a thread
+        # started before gunicorn forks would not exist in the workers
+        if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+            self._pid = os.getpid()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="rating-flusher", daemon=True)
+            self._thread.start()
+
+    def submit(self, movie_id, score):
+        with self._lock:
+            if len(self.pending) >= self.max_pending:
+                raise BufferFull("rating queue is full, retry shortly")
+            self.pending.append((movie_id, score, versions.utcnow()))
+            self.accepted += 1
+            if len(self.pending) >= self.batch_size:
+                self._wake.set()
+            self._ensure_flusher()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                log.exception("rating flush failed; %d votes kept for retry", len(self.pending))
+
+    def flush(self):
+        """Write every queued vote, batch_size per transaction; returns votes written."""
+        written = 0
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    batch = self.pending[:self.batch_size]
+                    del self.pending[:self.batch_size]
+                if not batch:
+                    return written
+                start = time.perf_counter()
+                try:
+                    with self.app.app_context():
+                        try:
+                            ok, dropped = write_votes(batch)
+                        except Exception:
+                            db.session.rollback()
+                            raise
+                except Exception:
+                    with self._lock:
+                        self.pending[:0] = batch
+                    self.failed_flushes += 1
+                    raise
+                self.last_flush_ms = round((time.perf_counter() - start) * 1000, 2)
+                self.written += ok
+                self.dropped += dropped
+                written += ok
+
+    def close(self):
+        """Stop the flusher and write whatever is still queued."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            self._thread.join(timeout=max(self.flush_seconds, 1) * 5)
+        if self.app is None or not self.pending:
+            return
+        try:
+            self.flush()
+        except Exception:
+            log.exception("%d votes lost at shutdown", len(self.pending))
+
+    def stats(self):
+        with self._lock:
+            pending = len(self.pending)
+        return {
+            "pending": pending,
+            "accepted": self.accepted,
+            "written": self.written,
+            "dropped_unknown_movie": self.dropped,
+            "failed_flushes": self.failed_flushes,
+            "last_flush_ms": self.last_flush_ms,
+            "flush_seconds": self.flush_seconds,
+            "batch_size": self.batch_size,
+        }
+
+
+rating_buffer = RatingBuffer()
+
+
+def benchmark_ratings(app, votes=50000, threads=8, direct_votes=500, seed=1):
+    """Votes per second through POST /movies/<id>/ratings and the flusher.
+
+    Writes real votes: point it at a scratch database. The buffered path
+    posts `votes` votes from `threads` threads and then times the flush;
+    the direct path writes `direct_votes` votes one transaction each,
+    which is what a synchronous endpoint would cost.
+    """
+    rng = random.Random(seed)
+    with app.app_context():
+        movie_ids = [m for (m,) in db.session.query(Movie.movie_id).limit(10000)]
+    if not movie_ids:
+        raise ValueError("no movies to rate; run flask seed first")
+    # skewed towards a few popular movies, as real traffic is
+    requests = [
+        (movie_ids[min(int(rng.expovariate(1 / 200)), len(movie_ids) - 1)], round(rng.uniform(1, 10), 1))
+        for _ in range(votes)
+    ]
+    client = app.test_client()
+    # keep the flusher out of the submit timing; the flush is timed on its own
+    flush_every, batch_size = rating_buffer.flush_seconds, rating_buffer.batch_size
+    rating_buffer.flush_seconds, rating_buffer.batch_size = 3600, 10 ** 9
+
+    def post(chunk):
+        statuses = defaultdict(int)
+        for movie_id, score in chunk:
+            statuses[client.post(f"/movies/{movie_id}/ratings", json={"score": score}).status_code] += 1
+        return statuses
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        results = list(pool.map(post, [requests[i::threads] for i in range(threads)]))
+    submit_seconds = time.perf_counter() - start
+    rating_buffer.flush_seconds, rating_buffer.batch_size = flush_every, batch_size
+    start = time.perf_counter()
+    flushed = rating_buffer.flush()
+    flush_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with app.app_context():
+        for movie_id, score in requests[:direct_votes]:
+            write_votes([(movie_id, Decimal(str(score)), versions.utcnow())])
+    direct_seconds = time.perf_counter() - start
+
+    statuses = defaultdict(int)
+    for result in results:
+        for status, count in result.items():
+            statuses[status] += count
+    return {
+        "votes": votes,
+        "threads": threads,
+        "statuses": dict(statuses),
+        "submit_per_second": round(votes / submit_seconds),
+        "flushed": flushed,
+        "flush_seconds": round(flush_seconds, 3),
+        "flush_per_second": round(flushed / flush_seconds) if flush_seconds else None,
+        "direct_votes": direct_votes,
+        "direct_per_second": round(direct_votes / direct_seconds) if direct_seconds else None,
+    }
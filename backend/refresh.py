@@ -0,0 +1,140 @@
+import logging
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+
+class RefreshingIndex:
+    """Process-wide in-memory index over the database.
+
+    The shared lifecycle of the search index, the credit graph, the
+    similarity index and the autocomplete index:
+      - built in a background thread, at startup with
+        init_app(app, warm=True) or else on first use; _current() waits
+        for that build, _ready() returns None until it is done;
+      - patched by this worker's write routes through _patch. With
+        copy_on_write, a patch goes to index.fork() (a copy sharing the
+        large immutable arrays) that then replaces the index, so a
+        snapshot handed out by _read never changes under its reader;
+      - rebuilt in the background once older than the refresh_setting
+        config value, to pick up other workers' writes. Patches made
+        while a build runs are replayed onto its result before it is
+        swapped in, so none of this worker's writes are lost;
+      - dropped by reset() after bulk loads; a build started before the
+        reset is discarded.
+
+    Subclasses implement build(), returning an object with a built_at
+    attribute (time.monotonic() at build time) and, with copy_on_write,
+    a fork() method. Reads go through _read, which only takes the lock
+    to fetch the current snapshot, so slow queries run side by side and
+    never hold up patches. Without copy_on_write, patches change the
+    index in place and readers must hold _lock themselves.
+    """
+
+    refresh_setting = None
+    copy_on_write = True
+
+    def __init__(self):
+        self.refresh_seconds = 300
+        self.app = None
+        self.index = None
+        self._lock = threading.RLock()
+        self._build_done = None  # threading.Event while a build runs
+        self._replay = None  # patches applied while it runs
+        self._epoch = 0  # bumped by reset()
+        self._error = None  # exception of the last failed build
+
+    def init_app(self, app, warm=False):
+        self.app = app
+        self.refresh_seconds = app.config.get(self.refresh_setting, 300)
+        self.reset()
+        if warm:
+            self._start_build()
+
+    def build(self):
+        raise NotImplementedError
+
+    def reset(self):
+        """Drop the index so the next lookup rebuilds it (after bulk loads)."""
+        with self._lock:
+            self.index = None
+            self._epoch += 1
+
+    def _start_build(self):
+        """Start a background build unless one is running; returns its Event."""
+        with self._lock:
+            if self._build_done is None:
+                self._build_done = threading.Event()
+                self._replay = []
+                threading.Thread(
+                    target=self._build_in_background, args=(self._epoch, self._build_done), daemon=True
+                ).start()
+            return self._build_done
+
+    def _build_in_background(self, epoch, done):
+        index = error = None
+        try:
+            with self.app.app_context():
+                index = self.build()
+        except Exception as e:
+            # e.g. tables not created yet; the next lookup tries again
+            error = e
+            log.warning("%s build failed", type(self).__name__, exc_info=True)
+        with self._lock:
+            if index is not None and epoch == self._epoch:
+                for patch in self._replay:
+                    patch(index)
+                self.index = index
+            self._error = error
+            self._build_done = None
+            self._replay = None
+        done.set()
+
+    def _refresh_if_stale(self):
+        if (self.refresh_seconds and self._build_done is None
+                and time.monotonic() - self.index.built_at > self.refresh_seconds):
+            self._start_build()
+
+    def _ready(self):
+        """The index, or None while the first build runs; never waits."""
+        with self._lock:
+            if self.index is None:
+                self._start_build()
+            else:
+                self._refresh_if_stale()
+            return self.index
+
+    def _current(self):
+        """The index, waiting for the first build if needed; starts a refresh when it is stale."""
+        while True:
+            with self._lock:
+                if self.index is not None:
+                    self._refresh_if_stale()
+                    return self.index
+                done = self._start_build()
+            done.wait()
+            with self._lock:
+                if self.index is None and self._error is not None:
+                    raise self._error
+
+    def _read(self, read):
+        """read(index) on a snapshot of the current index, without holding the lock."""
+        return read(self._current())
+
+    def _patchable(self):
+        """Whether a patch would be kept: there is an index, or one is being built."""
+        return self.index is not None or self._replay is not None
+
+    def _patch(self, patch):
+        """Apply patch(index) to the index, and replay it onto the one being built."""
+        with self._lock:
+            if self.index is not None:
+                if self.copy_on_write:
+                    index = self.index.fork()
+                    patch(index)
+                    self.index = index
+                else:
+                    patch(self.index)
+            if self._replay is not None:
+                self._replay.append(patch)
@@ -0,0 +1,131 @@
+from sqlalchemy import delete, insert, tuple_
+from models import db, Genre, Person, Role, MovieGenre, MoviePerson
+import stats
+import versions
+
+# Largest genre or credit list accepted by one PUT
+MAX_RELATION_ITEMS = 1000
+
+
+class InvalidRelations(ValueError):
+    pass
+
+
+def _insert_ignore(model):
+    return (
+        insert(model.__table__)
+        .prefix_with("IGNORE", dialect="mysql")
+        .prefix_with("OR IGNORE", dialect="sqlite")
+    )
+
+
+def parse_genre_ids(data):
+    """{"genre_ids": [...]} -> the distinct genre ids, in request order."""
+    if "genre_ids" not in data:
+        raise InvalidRelations("genre_ids required")
+    values = data["genre_ids"]
+    if not isinstance(values, list):
+        raise InvalidRelations("genre_ids must be a list")
+    if len(values) > MAX_RELATION_ITEMS:
+        raise InvalidRelations(f"at most {MAX_RELATION_ITEMS} genre_ids per request")
+    try:
+        return list(dict.fromkeys(int(v) for v in values))
+    except (TypeError, ValueError):
+        raise InvalidRelations("genre_ids must be integers")
+
+
+def parse_credits(data):
+    """{"people": [{person_id, role_id}, ...]} -> distinct (person_id, role_id) pairs."""
+    if "people" not in data:
+        raise InvalidRelations("people required")
+    people = data["people"]
+    if not isinstance(people, list) or not all(isinstance(c, dict) for c in people):
+        raise InvalidRelations("people must be a list of {person_id, role_id} objects")
+    if len(people) > MAX_RELATION_ITEMS:
+        raise InvalidRelations(f"at most {MAX_RELATION_ITEMS} people per request")
+    try:
+        credits = [(int(c["person_id"]), int(c["role_id"])) for c in people]
+    except (KeyError, TypeError, ValueError):
+        raise InvalidRelations("each credit needs an integer person_id and role_id")
+    return list(dict.fromkeys(credits))
+
+
+def _check_exist(pk, ids, name):
+    """One IN query; raises InvalidRelations naming ids that do not exist."""
+    ids = set(ids)
+    if not ids:
+        return
+    found = {v for (v,) in db.session.query(pk).filter(pk.in_(ids))}
+    missing = sorted(ids - found)
+    if missing:
+        raise InvalidRelations(f"unknown {name}: {', '.join(map(str, missing))}")
+
+
+def set_movie_genres(movie, genre_ids):
+    """Make movie's genres exactly genre_ids, in one transaction.
+
+    Reads the current links once, then writes the difference with one
+    multi-row INSERT IGNORE and one DELETE ... IN. Returns
+    {"added": [...], "removed": [...], "unchanged": n}; the caller commits.
+    """
+    _check_exist(Genre.genre_id, genre_ids, "genre_id")
+    current = set(stats.genre_ids_for(movie.movie_id))
+    wanted = set(genre_ids)
+    added, removed = sorted(wanted - current), sorted(current - wanted)
+    if added:
+        db.session.execute(
+            _insert_ignore(MovieGenre),
+            [{"movie_id": movie.movie_id, "genre_id": gid} for gid in added],
+        )
+    if removed:
+        db.session.execute(
+            delete(MovieGenre).where(
+                MovieGenre.movie_id == movie.movie_id,
+                MovieGenre.genre_id.in_(removed),
+            )
+        )
+    for gid in added:
+        stats.movie_genre_changed(movie.rating, gid, 1)
+    for gid in removed:
+        stats.movie_genre_changed(movie.rating, gid, -1)
+    if added or removed:
+        versions.touch("movie", movie.movie_id)
+    return {"added": added, "removed": removed, "unchanged": len(current & wanted)}
+
+
+def set_movie_credits(movie, credits):
+    """Make movie's credits exactly the (person_id, role_id) pairs in credits.
+
+    Same shape as set_movie_genres: one read of the current credits, one
+    multi-row INSERT IGNORE, one DELETE on (person_id, role_id) IN (...).
+    Every person whose credits changed gets a new version; the caller commits.
+    """
+    _check_exist(Person.person_id, [p for p, _ in credits], "person_id")
+    _check_exist(Role.role_id, [r for _, r in credits], "role_id")
+    current = set(
+        db.session.query(MoviePerson.person_id, MoviePerson.role_id)
+        .filter(MoviePerson.movie_id == movie.movie_id)
+        .all()
+    )
+    wanted = set(credits)
+    added, removed = sorted(wanted - current), sorted(current - wanted)
+    if added:
+        db.session.execute(
+            _insert_ignore(MoviePerson),
+            [{"movie_id": movie.movie_id, "person_id": p, "role_id": r} for p, r in added],
+        )
+    if removed:
+        db.session.execute(
+            delete(MoviePerson).where(
+                MoviePerson.movie_id == movie.movie_id,
+                tuple_(MoviePerson.person_id, MoviePerson.role_id).in_(removed),
+            )
+        )
+    if added or removed:
+        versions.touch("movie", movie.movie_id)
+        versions.touch_many("person", sorted({p for p, _ in added + removed}))
+    return {
+        "added": [{"person_id": p, "role_id": r} for p, r in added],
+        "removed": [{"person_id": p, "role_id": r} for p, r in removed],
+        "unchanged": len(current & wanted),
+    }
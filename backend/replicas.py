@@ -0,0 +1,150 @@
+import threading
+import time
+from flask import g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import text
+from sqlalchemy.sql.dml import UpdateBase
+from sqlalchemy.sql.elements import TextClause
+
+# Set after a write request; while it is fresh the client's reads go to the primary
+STICKY_COOKIE = "db_primary_until"
+READ_METHODS = ("GET", "HEAD")
+
+
+class ReplicaSet:
+    """Routes reads in GET/HEAD requests to read replicas.
+
+    Each URL in SQLALCHEMY_REPLICA_URIS becomes a Flask-SQLAlchemy bind
+    ("replica_1", ...) with the primary's engine options. A request
+    reads from one replica, picked round-robin among the healthy ones,
+    and falls back to the primary when there are none. Everything else
+    uses the primary:
+      - requests with other methods, and the rest of a GET request
+        once it has written anything;
+      - requests carrying a fresh STICKY_COOKIE, which write requests
+        set for REPLICA_STICKY_SECONDS so a client reads its own writes;
+      - work outside a request (CLI commands, background index builds).
+    A replica is skipped while it is unreachable or more than
+    REPLICA_MAX_LAG_SECONDS behind, checked at most every
+    REPLICA_LAG_CHECK_SECONDS.
+    """
+
+    def __init__(self):
+        self.keys = []
+        self.max_lag = 5
+        self.check_interval = 10
+        self.sticky_seconds = 5
+        self._health = {}  # key -> (checked_at, healthy, lag seconds or None)
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Register the replica binds; call after poolstats.init_app, before db.init_app."""
+        options = app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {})
+        binds = app.config.setdefault("SQLALCHEMY_BINDS", {})
+        self.keys = []
+        for i, url in enumerate(app.config.get("SQLALCHEMY_REPLICA_URIS", []), start=1):
+            key = f"replica_{i}"
+            binds[key] = dict(options, url=url)
+            self.keys.append(key)
+        self.max_lag = app.config.get("REPLICA_MAX_LAG_SECONDS", 5)
+        self.check_interval = app.config.get("REPLICA_LAG_CHECK_SECONDS", 10)
+        self.sticky_seconds = app.config.get("REPLICA_STICKY_SECONDS", 5)
+        self._health = {}
+        if not self.keys:
+            return
+
+        @app.after_request
+        def stick_to_primary(response):
+            if request.method not in READ_METHODS and response.status_code < 400 and self.sticky_seconds:
+                response.set_cookie(
+                    STICKY_COOKIE, str(time.time() + self.sticky_seconds),
+                    max_age=self.sticky_seconds, httponly=True, samesite="Lax",
+                )
+            return response
+
+    # -- routing
+
+    def _sticky(self):
+        try:
+            return float(request.cookies.get(STICKY_COOKIE, 0)) > time.time()
+        except ValueError:
+            return False
+
+    def read_engine(self, engines):
+        """The replica engine for a read in this request, or None for the primary."""
+        if not self.keys or not has_request_context():
+            return None
+        if request.method not in READ_METHODS or g.get("_db_primary"):
+            return None
+        if "_db_replica" not in g:
+            g._db_replica = None if self._sticky() else self._pick(engines)
+        return engines[g._db_replica] if g._db_replica else None
+
+    def mark_write(self):
+        if has_request_context():
+            g._db_primary = True
+
+    def _pick(self, engines):
+        with self._lock:
+            start = self._next
+            self._next = (self._next + 1) % len(self.keys)
+        for i in range(len(self.keys)):
+            key = self.keys[(start + i) % len(self.keys)]
+            if self.healthy(key, engines[key]):
+                return key
+        return None
+
+    # -- health
+
+    def healthy(self, key, engine):
+        now = time.monotonic()
+        checked_at, healthy, _ = self._health.get(key, (None, False, None))
+        if checked_at is None or now - checked_at >= self.check_interval:
+            lag = self.lag(engine)
+            healthy = lag is not None and (self.max_lag <= 0 or lag <= self.max_lag)
+            self._health[key] = (now, healthy, lag)
+        return healthy
+
+    def lag(self, engine):
+        """Seconds behind the primary; 0 when unknown (SQLite), None when unusable."""
+        try:
+            with engine.connect() as conn:
+                if engine.dialect.name != "mysql" or self.max_lag <= 0:
+                    conn.execute(text("SELECT 1"))
+                    return 0
+                try:
+                    row = conn.execute(text("SHOW REPLICA STATUS")).mappings().first()
+                    column = "Seconds_Behind_Source"
+                except Exception:
+                    # MySQL before 8.0.22
+                    row = conn.execute(text("SHOW SLAVE STATUS")).mappings().first()
+                    column = "Seconds_Behind_Master"
+                # no row: not a replica (e.g. a test double), so never behind
+                return 0 if row is None else row[column]
+        except Exception:
+            return None
+
+    def status(self):
+        """{key: {healthy, lag_seconds}} as of each replica's last check."""
+        return {
+            key: dict(zip(("healthy", "lag_seconds"), self._health.get(key, (None, None, None))[1:]))
+            for key in self.keys
+        }
+
+
+replicas = ReplicaSet()
+
+
+class RoutingSession(Session):
+    """db.session that asks `replicas` where each statement should run."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            if self._flushing or isinstance(clause, (UpdateBase, TextClause)):
+                replicas.mark_write()
+            else:
+                engine = replicas.read_engine(self._db.engines)
+                if engine is not None:
+                    return engine
+        return super().get_bind(mapper, clause=clause, bind=bind, **kwargs)
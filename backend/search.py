@@ -0,0 +1,342 @@
+import bisect
+import heapq
+import re
+import time
+from collections import defaultdict
+from sqlalchemy.dialects.mysql import match as mysql_match
+from models import db, Movie, Genre, Person, MoviePerson
+from refresh import RefreshingIndex
+from benchmark import latency_percentiles
+
+
+def normalize(s):
+    return " ".join((s or "").lower().split())
+
+
+def trigrams(s):
+    return {s[i:i + 3] for i in range(len(s) - 2)}
+
+
+class TextIndex:
+    """Trigram + word-prefix inverted index over one kind of document.
+
+    Queries of 3+ characters keep the old ilike('%q%') semantics: the
+    trigram postings narrow the candidates, then a substring check
+    confirms them. Shorter queries match the start of any word.
+    """
+
+    def __init__(self):
+        self.docs = {}  # doc_id -> (normalized text, boost)
+        self.grams = defaultdict(set)
+        self.words = defaultdict(set)
+        self._sorted_words = None
+
+    def add(self, doc_id, text, boost=0.0):
+        self.remove(doc_id)
+        text = normalize(text)
+        self.docs[doc_id] = (text, boost)
+        for g in trigrams(text):
+            self.grams[g].add(doc_id)
+        for w in text.split():
+            if w not in self.words:
+                self._sorted_words = None
+            self.words[w].add(doc_id)
+
+    def remove(self, doc_id):
+        entry = self.docs.pop(doc_id, None)
+        if entry is None:
+            return
+        text = entry[0]
+        for g in trigrams(text):
+            ids = self.grams.get(g)
+            if ids is not None:
+                ids.discard(doc_id)
+                if not ids:
+                    del self.grams[g]
+        for w in text.split():
+            ids = self.words.get(w)
+            if ids is not None:
+                ids.discard(doc_id)
+                if not ids:
+                    del self.words[w]
+                    self._sorted_words = None
+
+    def set_boost(self, doc_id, boost):
+        """Change one document's boost without re-indexing its text."""
+        entry = self.docs.get(doc_id)
+        if entry is not None:
+            self.docs[doc_id] = (entry[0], boost)
+
+    def matches(self, q):
+        if len(q) >= 3:
+            postings = sorted((self.grams.get(g, ()) for g in trigrams(q)), key=len)
+            ids = set(postings[0])
+            for p in postings[1:]:
+                if not ids:
+                    break
+                ids &= p
+            return {d for d in ids if q in self.docs[d][0]}
+        if self._sorted_words is None:
+            self._sorted_words = sorted(self.words)
+        words = self._sorted_words
+        ids = set()
+        i = bisect.bisect_left(words, q)
+        while i < len(words) and words[i].startswith(q):
+            ids |= self.words[words[i]]
+            i += 1
+        return ids
+
+    def search(self, q, limit=10):
+        """Return up to `limit` doc ids, best match first.
+
+        Exact matches rank above prefix matches, then word-start matches,
+        then any substring; ties go to the higher boost, then shorter text.
+        """
+        q = normalize(q)
+        if not q:
+            return []
+        scored = []
+        for doc_id in self.matches(q):
+            text, boost = self.docs[doc_id]
+            if text == q:
+                rank = 0
+            elif text.startswith(q):
+                rank = 1
+            elif (" " + q) in text:
+                rank = 2
+            else:
+                rank = 3
+            scored.append((rank, -boost, len(text), doc_id))
+        return [s[-1] for s in heapq.nsmallest(limit, scored)]
+
+
+class MemoryIndex:
+    """Movie, person and genre indexes for one worker process."""
+
+    def __init__(self):
+        self.movies = TextIndex()
+        self.people = TextIndex()
+        self.genres = TextIndex()
+        self.built_at = None
+
+    def build(self, chunk_size=10000):
+        rows = db.session.query(Movie.movie_id, Movie.title, Movie.rating)
+        for movie_id, title, rating in rows.yield_per(chunk_size):
+            self.movies.add(movie_id, title, float(rating or 0))
+
+        credits = dict(
+            db.session.query(MoviePerson.person_id, db.func.count())
+            .group_by(MoviePerson.person_id)
+            .all()
+        )
+        rows = db.session.query(Person.person_id, Person.first_name, Person.last_name)
+        for person_id, first_name, last_name in rows.yield_per(chunk_size):
+            self.people.add(person_id, f"{first_name} {last_name}", credits.get(person_id, 0))
+
+        for genre_id, genre_name in db.session.query(Genre.genre_id, Genre.genre_name):
+            self.genres.add(genre_id, genre_name)
+        self.built_at = time.monotonic()
+
+
+class Search(RefreshingIndex):
+    """Title/name search used by /search, /movies?search= and /people?name=.
+
+    SEARCH_BACKEND selects the implementation:
+      - "memory" (default): MemoryIndex, built in the background when
+        the worker starts (or on first use with INDEX_WARM_START off);
+        queries use the LIKE scans until it is ready. It is patched
+        by this worker's write routes. Other workers' writes show up
+        after SEARCH_REFRESH_SECONDS, when the index is rebuilt in the
+        background.
+      - "fulltext": MySQL MATCH ... AGAINST over FULLTEXT indexes (see
+        create_fulltext_indexes).
+      - "like": the original ilike('%q%') scans.
+    """
+
+    refresh_setting = "SEARCH_REFRESH_SECONDS"
+    # the text index is all dicts, too big to copy per patch: lookups are
+    # short and hold the lock instead
+    copy_on_write = False
+
+    def __init__(self):
+        super().__init__()
+        self.backend = "memory"
+        self.max_filter_ids = 1000
+
+    def init_app(self, app, warm=False):
+        self.backend = app.config.get("SEARCH_BACKEND", "memory")
+        self.max_filter_ids = app.config.get("SEARCH_MAX_FILTER_IDS", 1000)
+        super().init_app(app, warm=warm and self.backend == "memory")
+
+    def build(self):
+        index = MemoryIndex()
+        index.build()
+        return index
+
+    def _patch_doc(self, name, doc_id, text=None, boost=0.0):
+        def patch(index):
+            target = getattr(index, name)
+            if text is None:
+                target.remove(doc_id)
+            else:
+                target.add(doc_id, text, boost)
+        self._patch(patch)
+
+    def index_movie(self, movie):
+        self._patch_doc("movies", movie.movie_id, movie.title, float(movie.rating or 0))
+
+    def remove_movie(self, movie_id):
+        self._patch_doc("movies", movie_id)
+
+    def movies_rerated(self, ratings):
+        """{movie_id: rating} after a rating change; ratings break ties between titles."""
+        def patch(index):
+            for movie_id, rating in ratings.items():
+                index.movies.set_boost(movie_id, float(rating or 0))
+        self._patch(patch)
+
+    def index_person(self, person):
+        self._patch_doc("people", person.person_id, person.full_name())
+
+    def remove_person(self, person_id):
+        self._patch_doc("people", person_id)
+
+    def index_genre(self, genre):
+        self._patch_doc("genres", genre.genre_id, genre.genre_name)
+
+    def remove_genre(self, genre_id):
+        self._patch_doc("genres", genre_id)
+
+    # -- queries
+
+    def statement(self, kind, q, limit=10):
+        """Build the query for one of "movies", "people" or "genres".
+
+        Returns (select, ids). When ids is not None the memory index has
+        already ranked the results and the select just loads those rows,
+        which the caller puts back in ids order. The select is plain
+        SQLAlchemy, so the async entry point can run it as well. Until
+        the memory index has been built it is the LIKE query.
+        """
+        model, pk = SEARCH_MODELS[kind]
+        index = self._ready() if self.backend == "memory" else None
+        if index is not None:
+            with self._lock:
+                ids = getattr(index, kind).search(q, limit)
+            return db.select(model).where(pk.in_(ids)), ids
+        if kind == "movies":
+            text = Movie.title
+            match_columns = [Movie.title]
+        elif kind == "people":
+            text = Person.first_name + " " + Person.last_name
+            match_columns = [Person.first_name, Person.last_name]
+        else:
+            # the genre table is tiny, a scan is fine
+            text = Genre.genre_name
+            match_columns = None
+        if self.backend == "fulltext" and match_columns and _boolean_terms(q):
+            match = _match(match_columns, q)
+            return db.select(model).where(match > 0).order_by(match.desc()).limit(limit), None
+        return db.select(model).where(text.ilike(f"%{q}%")).limit(limit), None
+
+    def _run(self, kind, q, limit):
+        stmt, ids = self.statement(kind, q, limit)
+        if ids is not None and not ids:
+            return []
+        results = db.session.execute(stmt).scalars().all()
+        if ids is None:
+            return results
+        pk = SEARCH_MODELS[kind][1]
+        return in_order(results, ids, lambda o: getattr(o, pk.key))
+
+    def movies(self, q, limit=10):
+        return self._run("movies", q, limit)
+
+    def people(self, q, limit=10):
+        return self._run("people", q, limit)
+
+    def genres(self, q, limit=10):
+        return self._run("genres", q, limit)
+
+    def filter_movies(self, query, q):
+        """Restrict a Movie query to titles matching q.
+
+        Falls back to ilike when the memory index matches more titles
+        than SEARCH_MAX_FILTER_IDS, where an IN list stops paying off,
+        and while the index is still being built.
+        """
+        index = self._ready() if self.backend == "memory" else None
+        if index is not None:
+            with self._lock:
+                ids = index.movies.matches(normalize(q))
+            if len(ids) <= self.max_filter_ids:
+                return query.filter(Movie.movie_id.in_(ids))
+        elif self.backend == "fulltext" and _boolean_terms(q):
+            return query.filter(_match(Movie.title, q) > 0)
+        return query.filter(Movie.title.ilike(f"%{q}%"))
+
+
+SEARCH_MODELS = {
+    "movies": (Movie, Movie.movie_id),
+    "people": (Person, Person.person_id),
+    "genres": (Genre, Genre.genre_id),
+}
+
+
+def in_order(items, ids, key):
+    by_id = {key(item): item for item in items}
+    return [by_id[i] for i in ids if i in by_id]
+
+
+def _boolean_terms(q):
+    # InnoDB ignores tokens shorter than innodb_ft_min_token_size (3)
+    return " ".join(f"+{w}*" for w in re.findall(r"\w+", q) if len(w) >= 3)
+
+
+def _match(columns, q):
+    if not isinstance(columns, (list, tuple)):
+        columns = [columns]
+    return mysql_match(*columns, against=_boolean_terms(q)).in_boolean_mode()
+
+
+FULLTEXT_INDEXES = [
+    ("movie", "ft_movie_title", "title"),
+    ("person", "ft_person_name", "first_name, last_name"),
+]
+
+
+def create_fulltext_indexes():
+    """Add the FULLTEXT indexes the "fulltext" backend needs (MySQL only)."""
+    for table, name, columns in FULLTEXT_INDEXES:
+        exists = db.session.execute(db.text(
+            "SELECT COUNT(*) FROM information_schema.statistics "
+            "WHERE table_schema = DATABASE() AND table_name = :t AND index_name = :n"
+        ), {"t": table, "n": name}).scalar()
+        if not exists:
+            db.session.execute(db.text(f"ALTER TABLE {table} ADD FULLTEXT INDEX {name} ({columns})"))
+    db.session.commit()
+
+
+search = Search()
+
+
+def benchmark_search(index, queries, limit=10):
+    """Time /search-style lookups of movies and people, memory index against LIKE.
+
+    The LIKE numbers are what requests cost while the index is being
+    built; latencies in milliseconds.
+    """
+    timings = {"memory": [], "like": []}
+    for q in queries:
+        start = time.perf_counter()
+        for kind in ("movies", "people"):
+            ids = getattr(index, kind).search(q, limit)
+            model, pk = SEARCH_MODELS[kind]
+            db.session.execute(db.select(model).where(pk.in_(ids))).scalars().all()
+        timings["memory"].append((time.perf_counter() - start) * 1000)
+        start = time.perf_counter()
+        db.session.execute(db.select(Movie).where(Movie.title.ilike(f"%{q}%")).limit(limit)).scalars().all()
+        name = Person.first_name + " " + Person.last_name
+        db.session.execute(db.select(Person).where(name.ilike(f"%{q}%")).limit(limit)).scalars().all()
+        timings["like"].append((time.perf_counter() - start) * 1000)
+    return {"queries": len(queries), **{path: latency_percentiles(t) for path, t in timings.items()}}
@@ -0,0 +1,147 @@
+import random
+from datetime import date, timedelta
+from sqlalchemy import func, insert
+from models import db, Movie, Person, Genre, Role
+from importer import import_rows
+
+ROLE_NAMES = ["Actor", "Director", "Producer", "Writer", "Cinematographer", "Editor", "Composer"]
+GENRE_NAMES = [
+    "Drama", "Comedy", "Action", "Thriller", "Romance", "Horror", "Crime", "Adventure",
+    "Sci-Fi", "Fantasy", "Animation", "Documentary", "Mystery", "Family", "War",
+    "History", "Music", "Western", "Biography", "Sport",
+]
+TITLE_WORDS = [
+    "Silent", "River", "Night", "Last", "Golden", "Broken", "City", "Shadow", "Summer",
+    "Iron", "Secret", "Long", "Red", "Winter", "Road", "Home", "Fire", "Glass", "Dream",
+    "Wild", "Lost", "Dark", "Star", "Echo", "Stone", "Blue", "Harbor", "Storm", "Garden",
+    "Empire", "Crown", "Ghost", "Hunter", "Heart", "Mirror", "Island", "Kingdom", "Line",
+]
+FIRST_NAMES = [
+    "James", "Mary", "John", "Patricia", "Robert", "Jennifer", "Michael", "Linda", "David",
+    "Elizabeth", "William", "Susan", "Richard", "Jessica", "Joseph", "Sarah", "Thomas",
+    "Karen", "Carlos", "Aiko", "Priya", "Mateo", "Olga", "Kwame", "Ines", "Hiro", "Lena",
+]
+LAST_NAMES = [
+    "Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Lopez",
+    "Wilson", "Anderson", "Taylor", "Moore", "Martin", "Lee", "Thompson", "White", "Harris",
+    "Clark", "Tanaka", "Okafor", "Novak", "Rossi", "Kim", "Singh", "Dubois", "Costa",
+]
+
+
+def _skewed(rng, n, power):
+    """An index in [0, n), with low indexes much more likely as power grows."""
+    return int(n * rng.random() ** power)
+
+
+def _numbered(rows):
+    for line_no, row in enumerate(rows, start=1):
+        yield line_no, row
+
+
+def _next_id(pk):
+    return (db.session.query(func.max(pk)).scalar() or 0) + 1
+
+
+def ensure_roles():
+    """{role_name: role_id} for the roles in the table, adding any of ROLE_NAMES it lacks.
+
+    Matched by name, since an existing table may number its roles
+    differently; new roles take ids after the highest one in use.
+    """
+    # lowest id first wins when a name appears twice
+    roles = {name: role_id for role_id, name in
+             db.session.query(Role.role_id, Role.role_name).order_by(Role.role_id.desc())}
+    missing = [name for name in ROLE_NAMES if name not in roles]
+    if missing:
+        first_id = _next_id(Role.role_id)
+        rows = [{"role_id": i, "role_name": name} for i, name in enumerate(missing, start=first_id)]
+        db.session.execute(insert(Role.__table__), rows)
+        db.session.commit()
+        roles.update((row["role_name"], row["role_id"]) for row in rows)
+    return roles
+
+
+def movie_rows(rng, first_id, count):
+    for movie_id in range(first_id, first_id + count):
+        words = rng.sample(TITLE_WORDS, rng.choice((1, 2, 2, 3)))
+        title = " ".join(["The"] * (rng.random() < 0.3) + words)
+        if rng.random() < 0.1:
+            title += f" {rng.randint(2, 5)}"
+        rating = None if rng.random() < 0.05 else min(10.0, max(1.0, round(rng.gauss(6.4, 1.2), 1)))
+        yield {
+            "movie_id": movie_id,
+            "title": title,
+            # most of the catalogue is recent
+            "release_year": 2025 - _skewed(rng, 105, 2),
+            "duration": max(60, int(rng.gauss(105, 20))),
+            "rating": rating,
+        }
+
+
+def person_rows(rng, first_id, count):
+    for person_id in range(first_id, first_id + count):
+        dob = date(1930, 1, 1) + timedelta(days=rng.randrange(365 * 75))
+        yield {
+            "person_id": person_id,
+            "first_name": rng.choice(FIRST_NAMES),
+            "last_name": rng.choice(LAST_NAMES),
+            "dob": None if rng.random() < 0.2 else dob.isoformat(),
+        }
+
+
+def movie_genre_rows(rng, movie_ids, genre_ids):
+    for movie_id in movie_ids:
+        picked = {genre_ids[_skewed(rng, len(genre_ids), 2)] for _ in range(rng.choice((1, 2, 2, 3)))}
+        for genre_id in picked:
+            yield {"movie_id": movie_id, "genre_id": genre_id}
+
+
+def credit_rows(rng, movie_ids, person_ids, roles, cast_size):
+    """One director per movie plus a heavy-tailed cast.
+
+    People are drawn with a cubic skew, so a few prolific people appear
+    in thousands of movies and most appear in one or two.
+    """
+    actor, director = roles["Actor"], roles["Director"]
+    crew = [roles[name] for name in ROLE_NAMES[2:] if name in roles]
+    for movie_id in movie_ids:
+        yield {"movie_id": movie_id, "person_id": person_ids[_skewed(rng, len(person_ids), 3)], "role_id": director}
+        for _ in range(max(1, int(rng.expovariate(1 / cast_size)))):
+            yield {"movie_id": movie_id, "person_id": person_ids[_skewed(rng, len(person_ids), 3)], "role_id": actor}
+        for role_id in crew:
+            if rng.random() < 0.3:
+                yield {"movie_id": movie_id, "person_id": person_ids[_skewed(rng, len(person_ids), 3)], "role_id": role_id}
+
+
+def seed_catalogue(movies=10000, people=20000, cast_size=8, seed=42, chunk_size=5000):
+    """Append a synthetic catalogue to the current database.
+
+    Deterministic for a given seed and starting state. Ids continue after
+    the existing maximum, so it can top up the sample data. Rows are
+    written by importer.import_rows (chunked INSERT IGNORE); returns its
+    report per kind.
+    """
+    rng = random.Random(seed)
+    roles = ensure_roles()
+
+    reports = {}
+    existing = {name for (name,) in db.session.query(Genre.genre_name)}
+    reports["genres"] = import_rows("genres", _numbered(
+        {"genre_name": name} for name in GENRE_NAMES if name not in existing
+    ))
+    genre_ids = [gid for (gid,) in db.session.query(Genre.genre_id).order_by(Genre.genre_id)]
+
+    first_movie, first_person = _next_id(Movie.movie_id), _next_id(Person.person_id)
+    reports["movies"] = import_rows("movies", _numbered(movie_rows(rng, first_movie, movies)), chunk_size)
+    reports["people"] = import_rows("people", _numbered(person_rows(rng, first_person, people)), chunk_size)
+    movie_ids = range(first_movie, first_movie + movies)
+    person_ids = range(first_person, first_person + people)
+    reports["movie-genres"] = import_rows(
+        "movie-genres", _numbered(movie_genre_rows(rng, movie_ids, genre_ids)), chunk_size
+    )
+    reports["credits"] = import_rows(
+        "credits", _numbered(credit_rows(rng, movie_ids, person_ids, roles, cast_size)), chunk_size
+    )
+    for report in reports.values():
+        del report["errors"]
+    return reports
@@ -0,0 +1,170 @@
+from models import db, Movie, Genre, Person, Role, MovieGenre, MoviePerson
+
+# Keep IN (...) lists to a size MySQL plans well
+IN_CHUNK_SIZE = 500
+
+
+def chunked(ids, size=IN_CHUNK_SIZE):
+    for i in range(0, len(ids), size):
+        yield ids[i:i + size]
+
+
+# Selecting these instead of Movie yields plain rows: no ORM objects to
+# build, track in the session or expire, which dominates large pages
+MOVIE_COLUMNS = (Movie.movie_id, Movie.title, Movie.release_year, Movie.duration, Movie.rating)
+
+
+def movie_rows(q):
+    """Narrow a Movie query to MOVIE_COLUMNS; serialize_movies accepts its rows."""
+    return q.with_entities(*MOVIE_COLUMNS)
+
+
+def movie_fields(movie):
+    return dict(
+        movie_id=movie.movie_id,
+        title=movie.title,
+        release_year=movie.release_year,
+        duration=movie.duration,
+        rating=movie.rating,
+    )
+
+
+def load_genre_names(movie_ids):
+    """Return {movie_id: [genre_name, ...]} using one query per chunk of ids."""
+    genres = {movie_id: [] for movie_id in movie_ids}
+    for chunk in chunked(list(genres)):
+        rows = (
+            db.session.query(MovieGenre.movie_id, Genre.genre_name)
+            .join(Genre, Genre.genre_id == MovieGenre.genre_id)
+            .filter(MovieGenre.movie_id.in_(chunk))
+            .order_by(MovieGenre.movie_id, MovieGenre.genre_id)
+            .all()
+        )
+        for movie_id, genre_name in rows:
+            genres[movie_id].append(genre_name)
+    return genres
+
+
+def load_credits(movie_ids):
+    """Return {movie_id: [{person_id, name, role}, ...]} using one query per chunk of ids."""
+    credits = {movie_id: [] for movie_id in movie_ids}
+    for chunk in chunked(list(credits)):
+        rows = (
+            db.session.query(
+                MoviePerson.movie_id,
+                Person.person_id,
+                Person.first_name,
+                Person.last_name,
+                Role.role_name,
+            )
+            .join(Person, Person.person_id == MoviePerson.person_id)
+            .join(Role, Role.role_id == MoviePerson.role_id)
+            .filter(MoviePerson.movie_id.in_(chunk))
+            .order_by(MoviePerson.movie_id, MoviePerson.person_id, MoviePerson.role_id)
+            .all()
+        )
+        for movie_id, person_id, first_name, last_name, role_name in rows:
+            credits[movie_id].append({
+                "person_id": person_id,
+                "name": f"{first_name} {last_name}",
+                "role": role_name
+            })
+    return credits
+
+
+MOVIE_RELATIONS = ("genres", "people")
+
+
+def serialize_movies(movies, include_relations=True):
+    """Serialize already-loaded movies (objects or movie_rows rows), fetching relations in batch.
+
+    Genres and credits cost one query each (per IN_CHUNK_SIZE movies),
+    so the query count does not grow with the number of movies.
+    include_relations is True/False or a collection of MOVIE_RELATIONS
+    names, so callers that only need genres skip the credits query.
+    """
+    if include_relations is True:
+        include_relations = MOVIE_RELATIONS
+    items = [movie_fields(m) for m in movies]
+    if include_relations and items:
+        movie_ids = [d["movie_id"] for d in items]
+        if "genres" in include_relations:
+            genres = load_genre_names(movie_ids)
+            for d in items:
+                d["genres"] = genres[d["movie_id"]]
+        if "people" in include_relations:
+            credits = load_credits(movie_ids)
+            for d in items:
+                d["people"] = credits[d["movie_id"]]
+    return items
+
+
+def serialize_movie_ids(movie_ids, include_relations=True):
+    """Load and serialize movies by id, preserving the order of movie_ids."""
+    movie_ids = list(dict.fromkeys(movie_ids))
+    by_id = {}
+    for chunk in chunked(movie_ids):
+        for m in movie_rows(Movie.query.filter(Movie.movie_id.in_(chunk))):
+            by_id[m.movie_id] = m
+    movies = [by_id[movie_id] for movie_id in movie_ids if movie_id in by_id]
+    return serialize_movies(movies, include_relations=include_relations)
+
+
+def person_fields(person):
+    return dict(person_id=person.person_id, name=person.full_name())
+
+
+def load_filmographies(person_ids):
+    """Return {person_id: [{movie_id, title, role}, ...]} using one query per chunk of ids."""
+    filmographies = {person_id: [] for person_id in person_ids}
+    for chunk in chunked(list(filmographies)):
+        rows = (
+            db.session.query(
+                MoviePerson.person_id,
+                Movie.movie_id,
+                Movie.title,
+                Role.role_name,
+            )
+            .join(Movie, Movie.movie_id == MoviePerson.movie_id)
+            .join(Role, Role.role_id == MoviePerson.role_id)
+            .filter(MoviePerson.person_id.in_(chunk))
+            .order_by(MoviePerson.person_id, MoviePerson.movie_id, MoviePerson.role_id)
+            .all()
+        )
+        for person_id, movie_id, title, role_name in rows:
+            filmographies[person_id].append({
+                "movie_id": movie_id,
+                "title": title,
+                "role": role_name
+            })
+    return filmographies
+
+
+def filmography_rows(person_id):
+    """Query of one person's credits: (movie_id, role_id, title, role_name), unordered."""
+    return (
+        db.session.query(MoviePerson.movie_id, MoviePerson.role_id, Movie.title, Role.role_name)
+        .join(Movie, Movie.movie_id == MoviePerson.movie_id)
+        .join(Role, Role.role_id == MoviePerson.role_id)
+        .filter(MoviePerson.person_id == person_id)
+    )
+
+
+def serialize_credits(rows):
+    """filmography_rows() rows -> [{movie_id, title, role}, ...], as load_filmographies."""
+    return [{"movie_id": r.movie_id, "title": r.title, "role": r.role_name} for r in rows]
+
+
+def serialize_person_ids(person_ids, include_movies=True):
+    """Load and serialize people by id, preserving the order of person_ids."""
+    person_ids = list(dict.fromkeys(person_ids))
+    by_id = {}
+    for chunk in chunked(person_ids):
+        for p in Person.query.filter(Person.person_id.in_(chunk)).all():
+            by_id[p.person_id] = p
+    items = [person_fields(by_id[person_id]) for person_id in person_ids if person_id in by_id]
+    if include_movies and items:
+        movies = load_filmographies([d["person_id"] for d in items])
+        for d in items:
+            d["movies"] = movies[d["person_id"]]
+    return items
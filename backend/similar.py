@@ -0,0 +1,406 @@
+import copy
+import heapq
+import math
+import random
+import time
+from array import array
+from collections import defaultdict
+from graph import Adjacency
+from models import db, Movie, Role, MovieGenre, MoviePerson
+from refresh import RefreshingIndex
+from benchmark import latency_percentiles
+
+# Feature weight before IDF: what a shared credit in each role says about two movies
+ROLE_WEIGHTS = {"Director": 3.0, "Writer": 2.0, "Actor": 1.5, "Producer": 1.0}
+OTHER_ROLE_WEIGHT = 0.5
+GENRE_WEIGHT = 1.0
+GENRE_ROLE = 0  # role slot of genre features
+
+# Features in more movies than this (big genres, the most prolific people)
+# only re-score candidates; walking their postings would cost milliseconds each
+MAX_POSTINGS = 1000
+# Candidates re-scored exactly per requested result
+RESCORE_FACTOR = 10
+# Overridden movies at which the arrays are rebuilt with the overrides folded in
+COMPACT_AFTER = 10000
+
+MAX_SIMILAR = 50
+
+
+def person_feature(person_id):
+    return person_id * 2
+
+
+def genre_feature(genre_id):
+    return genre_id * 2 + 1
+
+
+def _is_genre(feature):
+    return feature & 1
+
+
+class SimilarityIndex:
+    """Sparse movie x feature matrix for "more like this" queries.
+
+    A movie's features are its genres and the people credited on it,
+    weighted by role and by inverse document frequency, so sharing a
+    director counts for more than sharing a genre and sharing a rare
+    actor for more than sharing a prolific one. The matrix is stored
+    twice in CSR form (by movie and by feature, four int arrays each,
+    see graph.Adjacency) with the movie norms alongside, and movies are
+    ranked by cosine similarity.
+
+    Movies changed after the build are held as whole-row overrides that
+    lookups prefer to the arrays. IDF weights are fixed at build time.
+    Ratings only order the postings; movies re-rated since the build
+    are held apart and merged back in by their new rating.
+    """
+
+    def __init__(self, movie_ids=(), features=(), roles=(), role_weights=None, ratings=()):
+        """ratings: (movie_id, rating) pairs in movie_id order, as build() reads them."""
+        self.by_movie = Adjacency(movie_ids, features, roles)
+        # stable sort: each feature's movies keep the input order (rating first)
+        self.by_feature = Adjacency(features, movie_ids, roles)
+        self.role_weights = role_weights or {}
+        self.movie_count = max(1, len(self.by_movie.keys))
+        self.norms = self._build_norms()
+        self.ratings = self._align_ratings(ratings)
+        self.overrides = {}  # movie_id -> [(feature, role), ...] replacing its row
+        self._override_postings = defaultdict(dict)  # feature -> {movie_id: role}
+        self._override_norms = {}
+        self.rerated = {}  # movie_id -> rating since the build
+        self._rerated_postings = defaultdict(dict)  # feature -> {movie_id: role}
+        self.built_at = time.monotonic()
+
+    @classmethod
+    def build(cls, chunk_size=10000):
+        role_weights = {r.role_id: ROLE_WEIGHTS.get(r.role_name, OTHER_ROLE_WEIGHT) for r in Role.query}
+        movie_ids, features, roles = array("i"), array("i"), array("i")
+        best_first = (Movie.rating.is_(None), Movie.rating.desc(), Movie.movie_id)
+        genres = (
+            db.session.query(MovieGenre.movie_id, MovieGenre.genre_id)
+            .join(Movie, Movie.movie_id == MovieGenre.movie_id)
+            .order_by(*best_first)
+        )
+        for movie_id, genre_id in genres.yield_per(chunk_size):
+            movie_ids.append(movie_id)
+            features.append(genre_feature(genre_id))
+            roles.append(GENRE_ROLE)
+        credits = (
+            db.session.query(MoviePerson.movie_id, MoviePerson.person_id, MoviePerson.role_id)
+            .join(Movie, Movie.movie_id == MoviePerson.movie_id)
+            .order_by(*best_first)
+        )
+        for movie_id, person_id, role_id in credits.yield_per(chunk_size):
+            movie_ids.append(movie_id)
+            features.append(person_feature(person_id))
+            roles.append(role_id)
+        ratings = (
+            db.session.query(Movie.movie_id, Movie.rating)
+            .filter(Movie.rating.isnot(None))
+            .order_by(Movie.movie_id)
+            .yield_per(chunk_size)
+        )
+        return cls(movie_ids, features, roles, role_weights, ratings)
+
+    def _align_ratings(self, ratings):
+        """Ratings parallel to by_movie.keys, -1 where unknown; one pass over both."""
+        keys = self.by_movie.keys
+        aligned = array("d", [-1.0]) * len(keys)
+        i = 0
+        for movie_id, rating in ratings:
+            while i < len(keys) and keys[i] < movie_id:
+                i += 1
+            if i == len(keys):
+                break
+            if keys[i] == movie_id and rating is not None:
+                aligned[i] = float(rating)
+        return aligned
+
+    def _build_norms(self):
+        """Norm of every movie's row, parallel to by_movie.keys.
+
+        Walks the matrix feature by feature so each feature's IDF is
+        computed once. A movie's entries for one feature are adjacent
+        (the postings are grouped by movie), so they are summed before
+        squaring, as vector() does.
+        """
+        squares = defaultdict(float)
+        by_feature, weights = self.by_feature, self.role_weights
+        for feature, start, end in zip(by_feature.keys, by_feature.offsets, by_feature.offsets[1:]):
+            idf = math.log(1 + self.movie_count / (end - start))
+            genre = _is_genre(feature)
+            last, value = None, 0.0
+            for movie_id, role in zip(by_feature.targets[start:end], by_feature.roles[start:end]):
+                if movie_id != last:
+                    if last is not None:
+                        squares[last] += value * value
+                    last, value = movie_id, 0.0
+                value += idf * (GENRE_WEIGHT if genre else weights.get(role, OTHER_ROLE_WEIGHT))
+            if last is not None:
+                squares[last] += value * value
+        return array("d", (math.sqrt(squares[m]) for m in self.by_movie.keys))
+
+    # -- weights
+
+    def df(self, feature):
+        start, end = self.by_feature.span(feature)
+        return max(1, end - start)
+
+    def idf(self, feature):
+        return math.log(1 + self.movie_count / self.df(feature))
+
+    def base_weight(self, feature, role):
+        return GENRE_WEIGHT if _is_genre(feature) else self.role_weights.get(role, OTHER_ROLE_WEIGHT)
+
+    def weight(self, feature, role):
+        return self.base_weight(feature, role) * self.idf(feature)
+
+    def vector(self, features):
+        """{feature: weight}; a person in two roles on one movie adds both."""
+        vec = defaultdict(float)
+        for feature, role in features:
+            vec[feature] += self.weight(feature, role)
+        return vec
+
+    def _norm(self, features):
+        return math.sqrt(sum(w * w for w in self.vector(features).values()))
+
+    def rating(self, movie_id):
+        """The movie's rating as the index knows it; -1 if unrated or unknown."""
+        if movie_id in self.rerated:
+            return self.rerated[movie_id]
+        i = self.by_movie.position(movie_id)
+        return self.ratings[i] if i >= 0 else -1.0
+
+    def norm(self, movie_id):
+        if movie_id in self.overrides:
+            return self._override_norms[movie_id]
+        i = self.by_movie.position(movie_id)
+        return self.norms[i] if i >= 0 else 0.0
+
+    # -- lookups
+
+    def features_of(self, movie_id):
+        if movie_id in self.overrides:
+            return self.overrides[movie_id]
+        return self.by_movie.get(movie_id)
+
+    def postings(self, feature, limit=None):
+        """[(movie_id, role), ...] having a feature; with a limit, the best rated ones first."""
+        start, end = self.by_feature.span(feature)
+        if limit is not None:
+            end = min(end, start + limit)
+        items = [
+            (m, r) for m, r in zip(self.by_feature.targets[start:end], self.by_feature.roles[start:end])
+            if m not in self.overrides and (limit is None or m not in self.rerated)
+        ]
+        items.extend(self._override_postings.get(feature, {}).items())
+        if limit is None:
+            return items
+        # re-rated movies compete for the best rated places wherever the build put them
+        items.extend((m, r) for m, r in self._rerated_postings.get(feature, {}).items() if m not in self.overrides)
+        items.sort(key=lambda item: -self.rating(item[0]))  # stable: ties keep the build order
+        return items[:limit]
+
+    def _accumulate(self, partial, feature, scale):
+        """partial[m] += scale * base weight of feature in m, for every movie m having it."""
+        if self.overrides:
+            postings = self.postings(feature)
+        else:
+            start, end = self.by_feature.span(feature)
+            postings = zip(self.by_feature.targets[start:end], self.by_feature.roles[start:end])
+        if _is_genre(feature):
+            add = scale * GENRE_WEIGHT
+            for other, _ in postings:
+                partial[other] += add
+        else:
+            weights = self.role_weights
+            for other, role in postings:
+                partial[other] += scale * weights.get(role, OTHER_ROLE_WEIGHT)
+
+    def similar(self, movie_id, limit=10):
+        """[(movie_id, score), ...], most similar first; score is a cosine in (0, 1].
+
+        Postings of selective features accumulate partial dot products;
+        the best RESCORE_FACTOR * limit candidates are then scored
+        exactly, adding the common features skipped so far. A movie
+        with only common features takes its candidates from the best
+        rated movies sharing them.
+        """
+        mine = self.vector(self.features_of(movie_id))
+        own_norm = self.norm(movie_id)
+        if not mine or not own_norm:
+            return []
+        partial = defaultdict(float)
+        common = {}  # feature -> my weight * idf, added while re-scoring
+        for feature, value in mine.items():
+            if self.df(feature) > MAX_POSTINGS:
+                common[feature] = value * self.idf(feature)
+                continue
+            self._accumulate(partial, feature, value * self.idf(feature))
+        partial.pop(movie_id, None)
+        pool = RESCORE_FACTOR * limit
+        candidates = heapq.nlargest(pool, partial, key=partial.__getitem__)
+        if len(candidates) < pool:
+            seen = set(candidates)
+            seen.add(movie_id)
+            for feature in common:
+                for other, _ in self.postings(feature, limit=pool):
+                    if other not in seen:
+                        seen.add(other)
+                        candidates.append(other)
+        scored = []
+        for other in candidates:
+            norm = self.norm(other)
+            if not norm:
+                continue
+            dot = partial.get(other, 0.0)
+            if common:
+                for f, role in self.features_of(other):
+                    if f in common:
+                        dot += common[f] * self.base_weight(f, role)
+            if dot > 0:
+                scored.append((other, dot / (own_norm * norm)))
+        best = heapq.nsmallest(limit, scored, key=lambda item: (-item[1], item[0]))
+        return [(other, round(min(score, 1.0), 4)) for other, score in best]
+
+    # -- incremental updates
+
+    def fork(self):
+        """A copy sharing the arrays, with its own overrides, for copy-on-write patches."""
+        other = copy.copy(self)
+        other.overrides = dict(self.overrides)
+        other._override_postings = defaultdict(dict, {f: dict(p) for f, p in self._override_postings.items()})
+        other._override_norms = dict(self._override_norms)
+        other.rerated = dict(self.rerated)
+        other._rerated_postings = defaultdict(dict, {f: dict(p) for f, p in self._rerated_postings.items()})
+        return other
+
+    def set_movie(self, movie_id, features):
+        """Replace one movie's features ([] removes the movie)."""
+        for feature, _ in self.overrides.get(movie_id, ()):
+            self._override_postings[feature].pop(movie_id, None)
+        features = list(features)
+        self.overrides[movie_id] = features
+        for feature, role in features:
+            self._override_postings[feature][movie_id] = role
+        self._override_norms[movie_id] = self._norm(features)
+        if movie_id in self.rerated:
+            self.set_rating(movie_id, self.rerated[movie_id])
+        if len(self.overrides) >= COMPACT_AFTER:
+            self._compact()
+
+    def set_rating(self, movie_id, rating):
+        """Record a movie's new rating, moving it in the rating order of its postings."""
+        for postings in self._rerated_postings.values():
+            postings.pop(movie_id, None)
+        self.rerated[movie_id] = -1.0 if rating is None else float(rating)
+        for feature, role in self.features_of(movie_id):
+            self._rerated_postings[feature][movie_id] = role
+
+    def remove_feature(self, feature):
+        """Drop a deleted genre or person from every movie that has it."""
+        for movie_id in {m for m, _ in self.postings(feature)}:
+            self.set_movie(movie_id, [(f, r) for f, r in self.features_of(movie_id) if f != feature])
+
+    def _compact(self):
+        movie_ids, features, roles = array("i"), array("i"), array("i")
+        # walk by feature so each feature's movies keep their rating order
+        edges = (
+            (m, f, r) for f, start, end in zip(self.by_feature.keys, self.by_feature.offsets, self.by_feature.offsets[1:])
+            for m, r in zip(self.by_feature.targets[start:end], self.by_feature.roles[start:end])
+        )
+        for m, f, r in edges:
+            if m not in self.overrides:
+                movie_ids.append(m)
+                features.append(f)
+                roles.append(r)
+        for m, row in self.overrides.items():
+            for f, r in row:
+                movie_ids.append(m)
+                features.append(f)
+                roles.append(r)
+        # the arrays keep their build order, so re-rated movies stay apart
+        old_movies, old_ratings = self.by_movie, self.ratings
+        built_at, rerated, rerated_postings = self.built_at, self.rerated, self._rerated_postings
+        self.__init__(movie_ids, features, roles, self.role_weights)
+        self.ratings = array("d", (
+            old_ratings[i] if i >= 0 else -1.0
+            for i in map(old_movies.position, self.by_movie.keys)
+        ))
+        self.built_at, self.rerated, self._rerated_postings = built_at, rerated, rerated_postings
+
+
+def load_features(movie_id):
+    """A movie's current [(feature, role), ...] from the database (two queries)."""
+    features = [
+        (genre_feature(gid), GENRE_ROLE)
+        for (gid,) in db.session.query(MovieGenre.genre_id).filter_by(movie_id=movie_id)
+    ]
+    features += [
+        (person_feature(pid), rid)
+        for pid, rid in db.session.query(MoviePerson.person_id, MoviePerson.role_id).filter_by(movie_id=movie_id)
+    ]
+    return features
+
+
+class Similarity(RefreshingIndex):
+    """Process-wide SimilarityIndex, built at startup or on first use.
+
+    Same lifecycle as graph.Credits (see refresh.RefreshingIndex): this
+    worker's writes patch the index, and it is rebuilt in the background
+    every SIMILAR_REFRESH_SECONDS to pick up other workers' writes and
+    fresh IDF weights.
+    """
+
+    refresh_setting = "SIMILAR_REFRESH_SECONDS"
+
+    def build(self):
+        return SimilarityIndex.build()
+
+    def movie_changed(self, movie_id):
+        """Re-read one movie's genres and credits after a write (skipped until the index is built)."""
+        if not self._patchable():
+            return
+        features = load_features(movie_id)
+        self._patch(lambda index: index.set_movie(movie_id, features))
+
+    def remove_movie(self, movie_id):
+        self._patch(lambda index: index.set_movie(movie_id, []))
+
+    def remove_genre(self, genre_id):
+        self._patch(lambda index: index.remove_feature(genre_feature(genre_id)))
+
+    def remove_person(self, person_id):
+        self._patch(lambda index: index.remove_feature(person_feature(person_id)))
+
+    def movies_rerated(self, ratings):
+        """{movie_id: rating} after a rating change, so postings stay best rated first."""
+        def patch(index):
+            for movie_id, rating in ratings.items():
+                index.set_rating(movie_id, rating)
+        self._patch(patch)
+
+    def similar(self, movie_id, limit=10):
+        return self._read(lambda index: index.similar(movie_id, limit))
+
+
+similar_movies = Similarity()
+
+
+def benchmark_similar(index, queries=500, limit=10, seed=1):
+    """Time index.similar for random movies; latencies in milliseconds."""
+    rng = random.Random(seed)
+    movie_ids = index.by_movie.keys
+    timings, empty = [], 0
+    for _ in range(queries):
+        movie_id = movie_ids[rng.randrange(len(movie_ids))]
+        start = time.perf_counter()
+        empty += not index.similar(movie_id, limit)
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        "queries": queries,
+        "no_results": empty,
+        **latency_percentiles(timings),
+    }
@@ -0,0 +1,154 @@
+from decimal import Decimal
+from sqlalchemy import case, func
+from models import db, Movie, Genre, Person, MovieGenre, SummaryStat
+from upsert import upsert
+
+HIST_COLUMNS = [f"hist_{i}" for i in range(10)]
+COUNTER_COLUMNS = ["item_count", "rating_count", "rating_sum"] + HIST_COLUMNS
+
+
+def movie_delta(rating, sign=1):
+    """Counter deltas for adding (sign=1) or removing (sign=-1) one movie."""
+    delta = {"item_count": sign}
+    if rating is not None:
+        rating = Decimal(str(rating))
+        delta["rating_count"] = sign
+        delta["rating_sum"] = rating * sign
+        delta[f"hist_{min(int(rating), 9)}"] = sign
+    return delta
+
+
+def apply_delta(scope, scope_key, delta):
+    """Atomically add `delta` to one summary row, creating it if needed.
+
+    Runs inside the caller's transaction, so the counters commit or roll
+    back together with the write that caused them.
+    """
+    table = SummaryStat.__table__
+    values = {c: 0 for c in COUNTER_COLUMNS}
+    values.update(delta)
+    values.update(scope=scope, scope_key=scope_key)
+    upsert(table, values, {c: (lambda new, c=c: table.c[c] + new[c]) for c in delta})
+
+
+def movie_scopes(release_year, genre_ids):
+    scopes = [("all", 0)]
+    if release_year is not None:
+        scopes.append(("year", release_year))
+    scopes.extend(("genre", gid) for gid in genre_ids)
+    return scopes
+
+
+def genre_ids_for(movie_id):
+    return [gid for (gid,) in db.session.query(MovieGenre.genre_id).filter_by(movie_id=movie_id)]
+
+
+def movie_added(rating, release_year, genre_ids=()):
+    for scope, key in movie_scopes(release_year, genre_ids):
+        apply_delta(scope, key, movie_delta(rating))
+
+
+def movie_removed(rating, release_year, genre_ids=()):
+    for scope, key in movie_scopes(release_year, genre_ids):
+        apply_delta(scope, key, movie_delta(rating, -1))
+
+
+def movie_changed(old_rating, old_year, new_rating, new_year, genre_ids):
+    if old_rating == new_rating and old_year == new_year:
+        return
+    movie_removed(old_rating, old_year, genre_ids)
+    movie_added(new_rating, new_year, genre_ids)
+
+
+def movies_rerated(changes):
+    """Batched movie_changed for rating-only changes.
+
+    changes: (old_rating, new_rating, release_year, genre_ids) per movie.
+    Deltas are summed per scope and written with one multi-row upsert,
+    so a flush of thousands of votes costs one statement here.
+    """
+    totals = {}
+    for old_rating, new_rating, release_year, genre_ids in changes:
+        if old_rating == new_rating:
+            continue
+        for scope in movie_scopes(release_year, genre_ids):
+            delta = totals.setdefault(scope, dict.fromkeys(COUNTER_COLUMNS, 0))
+            for sign, rating in ((-1, old_rating), (1, new_rating)):
+                for column, value in movie_delta(rating, sign).items():
+                    delta[column] += value
+    table = SummaryStat.__table__
+    rows = [dict(delta, scope=scope, scope_key=key) for (scope, key), delta in totals.items()]
+    upsert(table, rows, {c: (lambda new, c=c: table.c[c] + new[c]) for c in COUNTER_COLUMNS})
+
+
+def movie_genre_changed(rating, genre_id, sign):
+    apply_delta("genre", genre_id, movie_delta(rating, sign))
+
+
+def count_changed(scope, sign):
+    """Track total_genres ("genres") and total_people ("people")."""
+    apply_delta(scope, 0, {"item_count": sign})
+
+
+def genre_removed(genre_id):
+    count_changed("genres", -1)
+    SummaryStat.query.filter_by(scope="genre", scope_key=genre_id).delete()
+
+
+def _aggregates():
+    columns = [func.count(), func.count(Movie.rating), func.coalesce(func.sum(Movie.rating), 0)]
+    for i in range(10):
+        if i == 9:
+            cond = Movie.rating >= 9
+        else:
+            cond = (Movie.rating >= i) & (Movie.rating < i + 1)
+        columns.append(func.sum(case((cond, 1), else_=0)))
+    return columns
+
+
+def _row(scope, scope_key, values):
+    row = {c: 0 for c in COUNTER_COLUMNS}
+    row.update((c, v or 0) for c, v in zip(COUNTER_COLUMNS, values))
+    return dict(row, scope=scope, scope_key=scope_key)
+
+
+def reconcile():
+    """Rebuild every summary row from the base tables in one transaction.
+
+    Run periodically (flask --app app reconcile-stats) to correct any
+    drift, and after bulk loads that bypass the incremental updates.
+    """
+    try:
+        count = rebuild()
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return count
+
+
+def rebuild():
+    """reconcile() without the commit, for callers that own the transaction."""
+    rows = [_row("all", 0, db.session.query(*_aggregates()).one())]
+    by_year = (
+        db.session.query(Movie.release_year, *_aggregates())
+        .filter(Movie.release_year.isnot(None))
+        .group_by(Movie.release_year)
+    )
+    rows += [_row("year", year, values) for year, *values in by_year]
+    by_genre = (
+        db.session.query(MovieGenre.genre_id, *_aggregates())
+        .join(Movie, Movie.movie_id == MovieGenre.movie_id)
+        .group_by(MovieGenre.genre_id)
+    )
+    rows += [_row("genre", gid, values) for gid, *values in by_genre]
+    rows.append(_row("genres", 0, [Genre.query.count()]))
+    rows.append(_row("people", 0, [Person.query.count()]))
+    SummaryStat.query.delete()
+    db.session.execute(SummaryStat.__table__.insert(), rows)
+    return len(rows)
+
+
+def summaries(scope):
+    """{scope_key: SummaryStat} for every row in a scope."""
+    return {row.scope_key: row for row in SummaryStat.query.filter_by(scope=scope)}
@@ -0,0 +1,56 @@
+import os
+
+# app.py builds an app from the environment when imported: keep it off any real database
+os.environ["DATABASE_URL"] = "sqlite://"
+os.environ["DATABASE_REPLICA_URLS"] = ""
+os.environ["INDEX_WARM_START"] = "false"
+
+import pytest
+from app import create_app
+from models import db, Movie, Genre, Person, Role
+from seed import seed_catalogue
+import migrations
+import stats
+
+TEST_CONFIG = {
+    "SQLALCHEMY_DATABASE_URI": "sqlite://",
+    "SQLALCHEMY_REPLICA_URIS": [],
+    "INDEX_WARM_START": False,
+    "CACHE_BACKEND": "local",
+}
+
+
+def make_app(**config):
+    """An app on a fresh schema (in-memory SQLite unless overridden).
+
+    Only the base tables of Movie_database.sql are created directly;
+    everything else comes from the migrations, as in production.
+    """
+    app = create_app({**TEST_CONFIG, **config})
+    with app.app_context():
+        db.metadata.create_all(db.engine, tables=[m.__table__ for m in (Movie, Genre, Person, Role)])
+        migrations.upgrade()
+    return app
+
+
+@pytest.fixture
+def app():
+    app = make_app()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def catalogue(app):
+    """A small synthetic catalogue: 200 movies, 400 people, about 5 credits a movie."""
+    with app.app_context():
+        seed_catalogue(movies=200, people=400, cast_size=5)
+        stats.reconcile()
+    return app
+
+
+@pytest.fixture
+def client(catalogue):
+    return catalogue.test_client()
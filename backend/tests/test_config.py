@@ -0,0 +1,31 @@
+import importlib
+
+import pytest
+
+import config
+
+
+@pytest.fixture
+def reload_config(monkeypatch):
+    """Re-evaluate Config under patched environment variables, then restore it."""
+    def reload(**env):
+        for name, value in env.items():
+            monkeypatch.setenv(name, value)
+        return importlib.reload(config).Config
+    yield reload
+    monkeypatch.undo()
+    importlib.reload(config)
+
+
+def test_replica_urls_use_pymysql(reload_config):
+    Config = reload_config(DATABASE_REPLICA_URLS="mysql://u:p@r1/db, mysql+pymysql://u:p@r2/db,sqlite:///r3.db")
+    assert Config.SQLALCHEMY_REPLICA_URIS == [
+        "mysql+pymysql://u:p@r1/db",
+        "mysql+pymysql://u:p@r2/db",
+        "sqlite:///r3.db",
+    ]
+
+
+def test_primary_url_uses_pymysql(reload_config):
+    assert reload_config(DATABASE_URL="mysql://u:p@db/movies").SQLALCHEMY_DATABASE_URI == "mysql+pymysql://u:p@db/movies"
+    assert reload_config(DATABASE_URL="mysql+pymysql://u:p@db/movies").SQLALCHEMY_DATABASE_URI == "mysql+pymysql://u:p@db/movies"
@@ -0,0 +1,22 @@
+"""The list/filter endpoints reach their tables through the indexes that
+`flask migrate` creates (see explain.EXPLAIN_CHECKS)."""
+from explain import check_indexes, sqlite_scans
+
+
+def test_checked_endpoints_use_indexes(catalogue):
+    assert check_indexes(catalogue) == []
+
+
+def test_migrations_provision_every_table(app):
+    # no request-time DDL: a fresh schema plus `flask migrate` is enough to serve
+    client = app.test_client()
+    assert client.get("/movies/stats").status_code == 200
+    assert client.get("/movies/1").status_code == 404
+
+
+def test_sqlite_plan_text_of_every_version():
+    # 3.36+ and older SQLite word the same plan differently
+    assert sqlite_scans(["SCAN movie"], limited=False) == {"movie"}
+    assert sqlite_scans(["SCAN TABLE movie"], limited=False) == {"movie"}
+    assert sqlite_scans(["SCAN TABLE movie USING INDEX idx_movie_title"], limited=True) == set()
+    assert sqlite_scans(["SEARCH TABLE movie USING INTEGER PRIMARY KEY (rowid=?)"], limited=False) == set()
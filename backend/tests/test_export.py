@@ -0,0 +1,24 @@
+import json
+from datetime import datetime
+from urllib.parse import quote
+
+from models import db, EntityVersion
+
+
+def exported_ids(client, since):
+    response = client.get(f"/export/movies?updated_since={quote(since)}")
+    assert response.status_code == 200
+    return [json.loads(line)["movie_id"] for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_updated_since_with_an_offset_is_compared_in_utc(client, catalogue):
+    with catalogue.app_context():
+        EntityVersion.query.update({"updated_at": datetime(2026, 1, 1, 10, 0)})
+        EntityVersion.query.filter_by(entity="movie", entity_id=1).update({"updated_at": datetime(2026, 1, 1, 12, 0)})
+        db.session.commit()
+
+    # 11:00 UTC, written three ways
+    assert exported_ids(client, "2026-01-01T11:00:00") == [1]
+    assert exported_ids(client, "2026-01-01T13:00:00+02:00") == [1]
+    assert exported_ids(client, "2026-01-01T11:00:00Z") == [1]
+    assert exported_ids(client, "2026-01-01T14:30:00+02:00") == []
@@ -0,0 +1,33 @@
+import json
+
+from models import db, Movie
+
+
+def ndjson(*rows):
+    return "\n".join(json.dumps(row) for row in rows)
+
+
+def post_movies(client, body, **params):
+    query = "&".join(f"{k}={v}" for k, v in params.items())
+    response = client.post(f"/import/movies?{query}", data=body, content_type="application/x-ndjson")
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_reimport_skips_existing_rows_unless_updating(app):
+    client = app.test_client()
+    first = {"movie_id": 1, "title": "Old Title", "release_year": 2001, "duration": 90, "rating": 6.5}
+    changed = dict(first, title="New Title", rating=7.1)
+    assert post_movies(client, ndjson(first))["inserted"] == 1
+
+    report = post_movies(client, ndjson(changed, {"title": "Another"}))
+    assert (report["inserted"], report["updated"], report["duplicates"]) == (1, 0, 1)
+    with app.app_context():
+        assert db.session.get(Movie, 1).title == "Old Title"
+
+    report = post_movies(client, ndjson(changed, {"movie_id": 50, "title": "Fresh"}), mode="update")
+    assert (report["inserted"], report["updated"], report["duplicates"]) == (1, 1, 0)
+    with app.app_context():
+        movie = db.session.get(Movie, 1)
+        assert (movie.title, float(movie.rating)) == ("New Title", 7.1)
+        assert db.session.get(Movie, 50).title == "Fresh"
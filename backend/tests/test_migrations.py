@@ -0,0 +1,38 @@
+from app import create_app
+from models import db, Movie, Genre, Person, Role, SummaryStat
+from conftest import TEST_CONFIG
+import migrations
+
+
+def test_duplicate_genres_are_merged_not_fatal():
+    app = create_app(TEST_CONFIG)
+    with app.app_context():
+        db.metadata.create_all(db.engine, tables=[m.__table__ for m in (Movie, Person, Role)])
+        # as in Movie_database.sql, before migration 3 added the unique index
+        db.session.execute(db.text("CREATE TABLE genre (genre_id INT PRIMARY KEY, genre_name VARCHAR(50) NOT NULL)"))
+        migrations.relationship_tables(db.session.connection())
+        db.session.add_all([Movie(movie_id=m, title=f"Movie {m}") for m in (1, 2, 3)])
+        db.session.add_all([
+            Genre(genre_id=1, genre_name="Drama"),
+            Genre(genre_id=2, genre_name="Comedy"),
+            Genre(genre_id=3, genre_name="Drama"),
+            Genre(genre_id=4, genre_name="Drama"),
+        ])
+        db.session.flush()
+        db.session.execute(
+            db.text("INSERT INTO moviegenre (movie_id, genre_id) VALUES (:m, :g)"),
+            [{"m": 1, "g": 1}, {"m": 1, "g": 3}, {"m": 2, "g": 3}, {"m": 3, "g": 4}, {"m": 3, "g": 2}],
+        )
+        db.session.commit()
+
+        assert "unique_genre_name" in migrations.upgrade()
+
+        assert dict(db.session.query(Genre.genre_id, Genre.genre_name)) == {1: "Drama", 2: "Comedy"}
+        links = db.session.execute(db.text("SELECT movie_id, genre_id FROM moviegenre ORDER BY 1, 2")).all()
+        assert [tuple(row) for row in links] == [(1, 1), (2, 1), (3, 1), (3, 2)]
+        # migration 5 fills the summaries in its own transaction, from the merged genres
+        genres = {row.scope_key: row for row in SummaryStat.query.filter_by(scope="genre")}
+        assert set(genres) == {1, 2}
+        assert not migrations.pending()
+        db.session.remove()
+        db.engine.dispose()
@@ -0,0 +1,42 @@
+"""Query ceilings for the relation-heavy routes: a regression to per-row
+(N+1) loading shows up as one extra query per movie or credit."""
+import pytest
+from sqlalchemy import func
+from models import db, MovieGenre
+from querycount import assert_max_queries
+
+
+@pytest.fixture
+def counted(app, client):
+    """get(url, limit): one request, failing past `limit` SQL statements."""
+    def get(url, limit):
+        with app.app_context():
+            with assert_max_queries(limit, db.engine):
+                response = client.get(url)
+        assert response.status_code == 200
+        return response.get_json()
+    return get
+
+
+def test_top_rated_loads_relations_in_batches(counted):
+    # validator, movies, their genres, their credits
+    movies = counted("/movies/top-rated?limit=100", 4)
+    assert len(movies) == 100
+    assert any(m["people"] for m in movies)
+
+
+def test_movie_detail(counted):
+    # validator, movie, genres, credits
+    movie = counted("/movies/2", 4)
+    assert movie["people"]
+
+
+def test_genre_listing_is_one_query_per_page(app, counted):
+    with app.app_context():
+        genre_id, movies = (
+            db.session.query(MovieGenre.genre_id, func.count())
+            .group_by(MovieGenre.genre_id).order_by(func.count().desc()).first()
+        )
+    # validator, genre, one page of movies
+    page = counted(f"/genres/{genre_id}/movies?per_page=100", 3)
+    assert len(page["movies"]) == min(movies, 100)
@@ -0,0 +1,50 @@
+from autocomplete import autocomplete, PrefixIndex
+from models import db, Movie
+from ratings import RatingBuffer, rating_buffer
+from search import search
+from similar import similar_movies
+
+
+def test_vote_for_missing_movie_is_not_found(client):
+    response = client.post("/movies/999999/ratings", json={"score": 7})
+    assert response.status_code == 404
+    assert rating_buffer.stats()["pending"] == 0
+
+
+def test_flush_patches_index_ratings(client, catalogue):
+    with catalogue.app_context():
+        movie_id = db.session.query(Movie.movie_id).order_by(Movie.movie_id).first()[0]
+        # build the indexes now, so the flush has something to patch
+        for index in (search, autocomplete, similar_movies):
+            index._current()
+
+    response = client.post(f"/movies/{movie_id}/ratings", json={"score": 0.3})
+    assert response.status_code == 202
+    rating_buffer.flush()
+
+    with catalogue.app_context():
+        rating = float(db.session.get(Movie, movie_id).rating)
+    assert rating == 0.3
+    assert search._current().movies.docs[movie_id][1] == rating
+    assert autocomplete._current().indexes["movies"].score(movie_id) == rating
+    assert similar_movies._current().rating(movie_id) == rating
+
+
+def test_rescore_ranks_like_a_rebuild():
+    docs = [(i, f"The Movie {i}", float(i % 7)) for i in range(1, 60)]
+    index = PrefixIndex(docs)
+    for doc_id, score in ((3, 9.5), (14, 0.0), (50, 6.5)):
+        index.rescore(doc_id, score)
+        docs[doc_id - 1] = (doc_id, f"The Movie {doc_id}", score)
+    rebuilt = PrefixIndex(docs)
+    for prefix in ("the", "mov", "1", "5"):
+        assert index.complete(prefix, 10) == rebuilt.complete(prefix, 10)
+
+
+def test_exit_hook_is_registered_once(monkeypatch, app):
+    hooks = []
+    monkeypatch.setattr("ratings.atexit.register", hooks.append)
+    buffer = RatingBuffer()
+    buffer.init_app(app)
+    buffer.init_app(app)
+    assert hooks == [buffer.close]
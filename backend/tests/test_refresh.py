@@ -0,0 +1,74 @@
+import threading
+
+import pytest
+
+from autocomplete import PrefixIndex
+from graph import Credits, synthetic_graph
+
+
+class SyntheticCredits(Credits):
+    def build(self):
+        return synthetic_graph(people=500, movies=200, credits=2000)
+
+
+@pytest.fixture
+def credits(app):
+    credits = SyntheticCredits()
+    credits.init_app(app)
+    credits._current()
+    return credits
+
+
+def blocked_read(credits):
+    """Start a read that holds its snapshot until released; returns (release, thread, result)."""
+    started, release, result = threading.Event(), threading.Event(), {}
+
+    def read(index):
+        before = index.people_of(1)
+        started.set()
+        release.wait(5)
+        result["before"], result["after"] = before, index.people_of(1)
+        return True
+
+    thread = threading.Thread(target=credits._read, args=(read,))
+    thread.start()
+    assert started.wait(5)
+    return release, thread, result
+
+
+def run_with_timeout(fn, seconds=2):
+    """fn() in a thread; whether it finished within `seconds`."""
+    thread = threading.Thread(target=fn)
+    thread.start()
+    thread.join(seconds)
+    return not thread.is_alive()
+
+
+def test_concurrent_reads_do_not_serialize(credits):
+    release, thread, _ = blocked_read(credits)
+    try:
+        assert run_with_timeout(lambda: credits.collaborators(1))
+        assert run_with_timeout(lambda: credits.path(1, 2))
+    finally:
+        release.set()
+        thread.join()
+
+
+def test_patches_do_not_wait_for_or_change_a_running_read(credits):
+    release, thread, result = blocked_read(credits)
+    try:
+        assert run_with_timeout(lambda: credits.add_credit(1, 499, 3))
+    finally:
+        release.set()
+        thread.join()
+    assert result["before"] == result["after"]
+    assert (499, 3) not in result["after"]
+    assert (499, 3) in credits.people_of(1)
+
+
+def test_forked_prefix_index_rescores_without_touching_the_original():
+    index = PrefixIndex([(1, "Alpha", 1.0), (2, "Alpine", 2.0)])
+    fork = index.fork()
+    fork.rescore(1, 9.0)
+    assert [d for d, _ in fork.complete("alp")] == [1, 2]
+    assert [d for d, _ in index.complete("alp")] == [2, 1]
@@ -0,0 +1,54 @@
+"""Relation listings stay bounded in memory however large the relation."""
+import pytest
+from sqlalchemy import insert
+from models import db, Movie, Genre, Person, Role, MovieGenre, MoviePerson
+from benchmark import relation_memory_check
+from pagination import STREAM_CHUNK_SIZE
+from conftest import make_app
+
+MOVIES = 24 * STREAM_CHUNK_SIZE
+
+
+@pytest.fixture(scope="module")
+def big_relations():
+    """One genre, one year and one person's filmography each MOVIES long."""
+    app = make_app()
+    with app.app_context():
+        db.session.execute(insert(Genre.__table__), [{"genre_id": 1, "genre_name": "Drama"}])
+        db.session.execute(insert(Role.__table__), [{"role_id": 1, "role_name": "Actor"}])
+        db.session.execute(insert(Person.__table__), [{"person_id": 1, "first_name": "Busy", "last_name": "Actor"}])
+        db.session.execute(insert(Movie.__table__), [
+            {"movie_id": i, "title": f"Movie {i:05d}", "release_year": 2020, "rating": 7} for i in range(1, MOVIES + 1)
+        ])
+        db.session.execute(insert(MovieGenre.__table__), [{"movie_id": i, "genre_id": 1} for i in range(1, MOVIES + 1)])
+        db.session.execute(insert(MoviePerson.__table__), [
+            {"movie_id": i, "person_id": 1, "role_id": 1} for i in range(1, MOVIES + 1)
+        ])
+        db.session.commit()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+def test_pages_and_streams_do_not_load_the_whole_relation(big_relations):
+    result = relation_memory_check(big_relations, max_kb=2048)
+    assert result["failed"] == []
+    assert len(result["checks"]) == 6
+    for check in result["checks"]:
+        # a stream's body is larger than that: only one chunk of rows may be held at a time
+        assert check["peak_kb"] < 1024, check
+        if check["mode"] == "stream":
+            assert check["body_kb"] > 1024, check
+
+
+def test_stream_returns_every_row(big_relations):
+    response = big_relations.test_client().get("/people/1?stream=true")
+    assert response.mimetype == "application/x-ndjson"
+    assert len(response.get_data().splitlines()) == MOVIES
+
+
+def test_filmography_rejects_other_sorts(big_relations):
+    client = big_relations.test_client()
+    assert client.get("/people/1?sort=title").status_code == 400
+    assert client.get("/people/1?sort=movie_id&per_page=2").get_json()["movies"][0]["movie_id"] == 1
@@ -0,0 +1,77 @@
+"""Read/write routing with a replica bind on its own SQLite file.
+
+The replica starts as a copy of the primary with movie 1 renamed, so
+every response shows which database served it.
+"""
+import shutil
+import sqlite3
+import pytest
+from models import db
+from replicas import STICKY_COOKIE
+from seed import seed_catalogue
+from conftest import make_app
+
+
+def title(path, movie_id):
+    with sqlite3.connect(path) as conn:
+        row = conn.execute("SELECT title FROM movie WHERE movie_id = ?", (movie_id,)).fetchone()
+    return row[0] if row else None
+
+
+@pytest.fixture
+def dbs(tmp_path):
+    primary, replica = tmp_path / "primary.db", tmp_path / "replica.db"
+    app = make_app(SQLALCHEMY_DATABASE_URI=f"sqlite:///{primary}",
+                   SQLALCHEMY_REPLICA_URIS=[f"sqlite:///{replica}"])
+    with app.app_context():
+        seed_catalogue(movies=20, people=40, cast_size=3)
+        db.session.remove()
+        db.engine.dispose()
+    shutil.copy(primary, replica)
+    with sqlite3.connect(replica) as conn:
+        conn.execute("UPDATE movie SET title = 'On the replica' WHERE movie_id = 1")
+    yield app, primary, replica
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+def test_gets_read_from_the_replica(dbs):
+    app, primary, replica = dbs
+    client = app.test_client()
+    assert client.get("/movies/1").get_json()["title"] == "On the replica"
+    assert client.head("/movies/1").status_code == 200
+    assert client.get("/movies/1").get_json()["title"] == "On the replica"
+
+
+def test_writes_go_to_the_primary(dbs):
+    app, primary, replica = dbs
+    original = title(primary, 1)
+
+    response = app.test_client().post("/movies", json={"title": "Written"})
+    assert response.status_code == 201
+    movie_id = response.get_json()["movie_id"]
+    assert title(primary, movie_id) == "Written"
+    assert title(replica, movie_id) is None
+
+    # PUT reads the row it updates: that read must not see the replica's copy
+    response = app.test_client().put("/movies/1", json={"duration": 99})
+    assert response.get_json()["title"] == original
+    with sqlite3.connect(primary) as conn:
+        assert conn.execute("SELECT duration FROM movie WHERE movie_id = 1").fetchone()[0] == 99
+
+    assert app.test_client().delete("/movies/2").status_code == 200
+    assert title(primary, 2) is None
+    assert title(replica, 2) is not None
+
+
+def test_sticky_cookie_reads_from_the_primary(dbs):
+    app, primary, replica = dbs
+    client = app.test_client()
+    client.put("/movies/1", json={"duration": 99})
+    assert client.get_cookie(STICKY_COOKIE) is not None
+    assert client.get("/movies/1").get_json()["title"] == title(primary, 1)
+
+    # an expired cookie is ignored
+    client.set_cookie(STICKY_COOKIE, "0")
+    assert client.get("/movies/1").get_json()["title"] == "On the replica"
@@ -0,0 +1,21 @@
+from models import db, MoviePerson, Role
+from seed import ROLE_NAMES, seed_catalogue
+
+
+def test_seed_matches_existing_roles_by_name(app):
+    with app.app_context():
+        db.session.add_all([
+            Role(role_id=1, role_name="Stunts"),
+            Role(role_id=2, role_name="Gaffer"),
+            Role(role_id=3, role_name="Actor"),
+        ])
+        db.session.commit()
+
+        seed_catalogue(movies=20, people=40, cast_size=3)
+
+        roles = dict(db.session.query(Role.role_name, Role.role_id))
+        assert roles["Stunts"] == 1 and roles["Gaffer"] == 2 and roles["Actor"] == 3
+        assert set(ROLE_NAMES) <= set(roles) and len(roles) == 2 + len(ROLE_NAMES)
+        used = {role_id for (role_id,) in db.session.query(MoviePerson.role_id).distinct()}
+        assert {roles["Actor"], roles["Director"]} <= used
+        assert not used & {1, 2}
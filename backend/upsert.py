@@ -0,0 +1,29 @@
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from models import db
+
+
+def upsert(table, values, update):
+    """INSERT `values`, or apply `update` to the row that already has its key.
+
+    `values` is one row as a dict, or a list of dicts for a batched
+    multi-row upsert.
+
+    `update` maps column names to functions taking the proposed row
+    (inserted/excluded) and returning the new value, e.g.
+    {"hits": lambda new: table.c.hits + new.hits}. Executes in the
+    current session transaction.
+    """
+    many = isinstance(values, list)
+    if many and not values:
+        return
+    if db.session.get_bind().dialect.name == "mysql":
+        stmt = mysql_insert(table)
+        stmt = stmt.on_duplicate_key_update({c: fn(stmt.inserted) for c, fn in update.items()})
+    else:
+        stmt = sqlite_insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[c.name for c in table.primary_key.columns],
+            set_={c: fn(stmt.excluded) for c, fn in update.items()},
+        )
+    db.session.execute(stmt, values if many else [values])
@@ -0,0 +1,59 @@
+from datetime import datetime, timezone
+from models import db, EntityVersion, MovieGenre, MoviePerson
+from upsert import upsert
+
+# Row bumped by every write; versions any response that has no entity of its own
+CATALOGUE = ("catalogue", 0)
+
+def utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def touch(entity, entity_id, deleted=False):
+    """Record a change to one entity inside the caller's transaction."""
+    touch_many(entity, [entity_id], deleted)
+
+
+def touch_many(entity, entity_ids, deleted=False):
+    """Record changes to several entities; also bumps the catalogue version."""
+    table = EntityVersion.__table__
+    now = utcnow()
+    rows = [
+        dict(entity=entity, entity_id=i, version=1, updated_at=now, deleted=deleted)
+        for i in entity_ids
+    ]
+    rows.append(dict(entity=CATALOGUE[0], entity_id=CATALOGUE[1], version=1, updated_at=now, deleted=False))
+    upsert(table, rows, {
+        "version": lambda new: table.c.version + 1,
+        "updated_at": lambda new: new.updated_at,
+        "deleted": lambda new: new.deleted,
+    })
+
+
+def bump_catalogue():
+    touch_many(CATALOGUE[0], [])
+
+
+def current(entity, entity_id):
+    """(version, updated_at) for one entity, or (0, None) if never changed.
+
+    A single primary-key lookup on entityversion, no ORM objects built.
+    """
+    row = db.session.execute(
+        db.select(EntityVersion.version, EntityVersion.updated_at)
+        .where(EntityVersion.entity == entity, EntityVersion.entity_id == entity_id)
+    ).first()
+    return (row.version, row.updated_at) if row else (0, None)
+
+
+# Related ids whose responses embed another entity's fields
+def movies_of_person(person_id):
+    return [mid for (mid,) in db.session.query(MoviePerson.movie_id).filter_by(person_id=person_id).distinct()]
+
+
+def movies_of_genre(genre_id):
+    return [mid for (mid,) in db.session.query(MovieGenre.movie_id).filter_by(genre_id=genre_id)]
+
+
+def people_of_movie(movie_id):
+    return [pid for (pid,) in db.session.query(MoviePerson.person_id).filter_by(movie_id=movie_id).distinct()]